@@ -0,0 +1,14 @@
+#!/bin/sh
+# Entrypoint of the API, worker and renderer containers: empty the metric files of this container's earlier run, they
+# would otherwise be added to the new metrics (see swagger_server/metrics.py), then run the command.
+set -e
+
+metrics_dir="${PROMETHEUS_MULTIPROC_DIR:-/usr/src/app/logs/metrics}"
+mkdir -p "$metrics_dir"
+find "$metrics_dir" -mindepth 1 -delete
+if [ "$(id -u)" = 0 ]; then
+    # The API processes run as worker
+    chown worker:apache "$metrics_dir"
+fi
+
+exec "$@"
@@ -29,7 +29,9 @@ setup(
     package_data={'': ['swagger/swagger.yaml']},
     include_package_data=True,
     entry_points={
-        'console_scripts': ['swagger_server=swagger_server.__main__:main']},
+        'console_scripts': ['swagger_server=swagger_server.__main__:main',
+                            'swagger_worker=swagger_server.worker:main',
+                            'swagger_renderer=swagger_server.renderer:main']},
     long_description="""\
     REST API of the 5GASP Certification Entity
     """
@@ -8,6 +8,8 @@ if not os.path.exists(c.cert_files_dir):
     os.makedirs(c.cert_files_dir)
 if not os.path.exists(c.template_dir):
     os.mkdir(c.template_dir)
+if not os.path.exists(c.document_dir):
+    os.mkdir(c.document_dir)
 if not os.path.exists(c.log_dir):
     os.mkdir(c.log_dir)
 if not os.path.exists(c.database):
@@ -15,6 +17,6 @@ if not os.path.exists(c.database):
         f.write('{}')
 
 # Verify that the required files for certificate creation are present.
-for file in [c.cert_template, c.cert_failed_template, c.logo_ec, c.logo_5gasp]:
-    if not os.path.exists(c.cert_template):
+for file in [c.cert_template, c.cert_failed_template, c.cert_stylesheet, c.logo_ec, c.logo_5gasp]:
+    if not os.path.exists(file):
         raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), file)
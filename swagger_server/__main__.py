@@ -3,10 +3,12 @@
 import connexion
 
 from swagger_server import __init__
+from swagger_server import constants as c
 from swagger_server import encoder
 
 app = connexion.App(__name__, specification_dir='./swagger/')
 app.json_provider_class = encoder.JSONEncoder
+app.app.config['USE_X_SENDFILE'] = c.use_x_sendfile
 app.add_api('swagger.yaml', arguments={'title': 'Certification Entity API'}, pythonic_params=True)
 
 
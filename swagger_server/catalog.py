@@ -0,0 +1,252 @@
+"""
+Test catalog cache
+
+The test catalog (/tests/all on the CI/CD Manager) rarely changes, so it is kept in Redis and shared by all processes.
+Every test bed is stored as a separate field of a hash, next to a meta hash with the catalog version, the validators
+of the last response (ETag, Last-Modified) and a hash of its content. After the TTL, one process revalidates the
+catalog with a conditional request in a background thread, the version is only increased if the content changed. All
+processes keep using the stored catalog meanwhile, only at the first start they wait for it. The response is parsed one test bed at a time
+while it is read, see streaming.py.
+Each process keeps the decoded test beds of the current version in memory, along with their condition indexes.
+"""
+import json
+import secrets
+import threading
+import time
+
+from swagger_server import cicd_client
+from swagger_server import conditions
+from swagger_server import constants as c
+from swagger_server import log
+from swagger_server import metrics
+from swagger_server import streaming
+from swagger_server import util
+from swagger_server.controllers.__init__ import logger, mRedis
+
+# Held to swap the local copy to a new version and to add test beds to it
+_lock = threading.Lock()
+# Release the revalidation lock only if it is still the one taken with the token, it may have expired meanwhile and been
+# taken by another process.
+_release_script = mRedis.register_script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+""")
+
+
+@util.per_process
+def _local():
+    # Process-local copy of the catalog
+    return {
+        'version': 0,
+        'synced': 0.0,
+        'tests': {},
+        'indexes': {},
+        'revalidating': False,
+    }
+
+
+def _decode(meta):
+    return {k.decode(): v.decode() for k, v in meta.items()}
+
+
+def _parse(response, uri):
+    # Test beds and validators of a response, None if the stored catalog is still valid
+    if response.status_code == 304:
+        return None
+    # Only one test bed at a time is decoded, the others are kept encoded for Redis
+    test_beds = streaming.CatalogTestBeds(response, uri)
+    tests = {k: json.dumps(v) for k, v in test_beds}
+    validators = {
+        'etag': response.headers.get('ETag', ''),
+        'last_modified': response.headers.get('Last-Modified', ''),
+        'digest': test_beds.digest,
+        'fetched_at': time.time(),
+    }
+    return tests, validators
+
+
+def refresh(force=False):
+    """Revalidate the catalog from the CI/CD Manager and store it in Redis if it changed.
+
+    :param force: skip the conditional request headers, i.e. always download the full catalog
+    :type force: bool
+
+    :return: catalog version, error message
+    :rtype: int, str
+    """
+    meta = _decode(mRedis.hgetall(c.catalog_meta_key))
+    version = int(meta.get('version', 0))
+    headers = {}
+    if not force:
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+    uri = '/tests/all'
+    msg_prefix = f"Test catalog with '{uri}'"
+    result, err_msg = cicd_client.get_json(uri, msg_prefix, parse=lambda r: _parse(r, uri), headers=headers,
+                                           stream=streaming.enabled(), statuses=(200, 304))
+    if err_msg:
+        return version, err_msg
+    if result is None:
+        mRedis.hset(c.catalog_meta_key, 'fetched_at', time.time())
+        logger.debug("Test catalog version %s is still valid", version)
+        return version, ""
+    tests, validators = result
+    if validators['digest'] == meta.get('digest'):
+        mRedis.hset(c.catalog_meta_key, mapping=validators)
+        logger.debug("Test catalog version %s is unchanged", version)
+        return version, ""
+    if not tests:
+        err_msg = "Could not find the key 'tests' in test case data from CI/CD Manager (/tests/all) or it was empty."
+        logger.error("%s: %s", msg_prefix, log.Payload(err_msg))
+        return version, err_msg
+
+    pipe = mRedis.pipeline()
+    pipe.delete(c.catalog_key)
+    pipe.hset(c.catalog_key, mapping=tests)
+    pipe.hset(c.catalog_meta_key, mapping=validators)
+    pipe.hincrby(c.catalog_meta_key, 'version', 1)
+    version = pipe.execute()[-1]
+    logger.info("Test catalog updated to version %s with test beds: %s", version, log.Payload(sorted(tests)))
+    return version, ""
+
+
+def _revalidate(stored_version):
+    # Only one process revalidates at a time. The others keep using the stored catalog meanwhile or, if there is none
+    # yet, wait for the one of the revalidating process.
+    deadline = time.monotonic() + c.catalog_lock_timeout
+    while True:
+        token = secrets.token_hex(16)
+        if mRedis.set(c.catalog_lock_key, token, nx=True, ex=c.catalog_lock_timeout):
+            try:
+                _, err_msg = refresh()
+            finally:
+                _release_script(keys=[c.catalog_lock_key], args=[token])
+            return err_msg
+        if stored_version:
+            return ""
+        while mRedis.exists(c.catalog_lock_key):
+            if time.monotonic() >= deadline:
+                return "The test catalog is not available yet."
+            time.sleep(c.catalog_wait_interval)
+        if int(mRedis.hget(c.catalog_meta_key, 'version') or 0):
+            return ""
+        # The other process could not load the catalog, try again
+
+
+def _revalidate_in_background(stored_version):
+    # Requests keep using the stored catalog while it is revalidated, at most one thread per process
+    local = _local()
+    with _lock:
+        if local['revalidating']:
+            return
+        local['revalidating'] = True
+
+    def run():
+        try:
+            _revalidate(stored_version)
+        except Exception as e:
+            logger.error("Could not revalidate the test catalog: %s", e)
+        finally:
+            local['revalidating'] = False
+
+    threading.Thread(target=run, name='catalog-revalidate', daemon=True).start()
+
+
+def sync():
+    """Make sure the local copy of the catalog is up to date. Redis is checked at most every catalog_sync_interval
+    seconds. If the catalog is older than catalog_ttl seconds, it is revalidated with the CI/CD Manager in the
+    background, only if there is no stored catalog yet this waits for it.
+
+    :return: error message if the catalog could not be loaded
+    :rtype: str
+    """
+    local = _local()
+    now = time.time()
+    if local['version'] and now - local['synced'] < c.catalog_sync_interval:
+        return ""
+    meta = _decode(mRedis.hgetall(c.catalog_meta_key))
+    err_msg = ""
+    version = int(meta.get('version', 0))
+    if now - float(meta.get('fetched_at', 0)) > c.catalog_ttl:
+        if version:
+            _revalidate_in_background(version)
+        else:
+            err_msg = _revalidate(version)
+            version = int(mRedis.hget(c.catalog_meta_key, 'version') or 0)
+    with _lock:
+        if version != local['version']:
+            local['tests'] = {}
+            local['indexes'] = {}
+            local['version'] = version
+        local['synced'] = now
+    if not version:
+        return err_msg or "The test catalog is not available yet."
+    return ""
+
+
+def version():
+    """Return the version of the catalog, which changes whenever its content changes.
+
+    :rtype: int
+    """
+    sync()
+    return _local()['version']
+
+
+def get_tests(test_bed):
+    """Return the test cases of a test bed from the catalog.
+
+    :param test_bed: test bed ID
+    :type test_bed: str
+
+    :return: test case info of the test bed (empty if the test bed is unknown), error message
+    :rtype: dict, str
+    """
+    err_msg = sync()
+    if err_msg:
+        return {}, err_msg
+    local = _local()
+    version = local['version']
+    tests = local['tests'].get(test_bed)
+    metrics.cache('catalog', tests is not None)
+    if tests is None:
+        data = mRedis.hget(c.catalog_key, test_bed)
+        tests = json.loads(data) if data else {}
+        with _lock:
+            # Not cached if a new version was swapped in meanwhile, the test bed may be the one of the old version
+            if local['version'] == version:
+                tests = local['tests'].setdefault(test_bed, tests)
+    return tests, ""
+
+
+def get_index(test_bed, tests=None):
+    """Return the condition index of a test bed. The index of the catalog's test cases is built once per catalog
+    version.
+
+    :param test_bed: test bed ID
+    :type test_bed: str
+    :param tests: test case info of the test bed, taken from the catalog if not given
+    :type tests: dict
+
+    :return: condition index (None on error), error message
+    :rtype: conditions.ConditionIndex, str
+    """
+    if tests is None:
+        tests, err_msg = get_tests(test_bed)
+        if err_msg:
+            return None, err_msg
+    local = _local()
+    if tests is not local['tests'].get(test_bed):
+        # Not the test cases of the current catalog version, e.g. passed in by the caller
+        return conditions.ConditionIndex(tests), ""
+    index = local['indexes'].get(test_bed)
+    if index is None:
+        index = conditions.ConditionIndex(tests)
+        with _lock:
+            if tests is local['tests'].get(test_bed):
+                index = local['indexes'].setdefault(test_bed, index)
+    return index, ""
@@ -1,38 +1,29 @@
 """
 5GASP Certification Entity
 """
+import hashlib
+import json
 import os
-import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
 
-import matplotlib
-import matplotlib.pyplot as plt
-import numpy as np
-import requests
-import requests.exceptions
 from flask import Markup
-from weasyprint import HTML
 
+from swagger_server import catalog
+from swagger_server import chart
+from swagger_server import cicd_client
 from swagger_server import constants as c
-from swagger_server.controllers.__init__ import logger
-
-
-def _get_testbed_name(id_):
-    url = 'https://ci-cd-manager.5gasp.eu/manager/testbeds/all'
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            payload = response.json()
-            for testbed in payload['data']['testbeds']:
-                if testbed['id'] == id_:
-                    return testbed['name']
-        else:
-            pass
-    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
-        logger.error(f"Cannot connect to CI/CD Manager: {e}")
-    except Exception:
-        pass
-    return id_
+from swagger_server import log
+from swagger_server import metrics
+from swagger_server import render
+from swagger_server import store
+from swagger_server import streaming
+from swagger_server import templates
+from swagger_server import tracing
+from swagger_server import testbeds
+from swagger_server.controllers.__init__ import logger, mRedis
 
 
 def _build_base_dictionary(base_info, results, test_cases, cert_tc_list):
@@ -79,6 +70,8 @@ def _build_base_dictionary(base_info, results, test_cases, cert_tc_list):
         c.axis_3: {},
         c.axis_4: {},
     }
+    # Entries of the base dictionary by test case ID
+    entries = {}
     err_msg = []
     msg_tc = "For test case '{0}': Could not find the key '{1}' or its value '{2}' is invalid."
     for test in cert_tc_list:
@@ -100,11 +93,68 @@ def _build_base_dictionary(base_info, results, test_cases, cert_tc_list):
             'results': [],
             'start_time': '',
         }
-        tmp_dict = base_dict.get(axis, {})
-        tmp_dict.update({test: tc_info})
-        base_dict.update({axis: tmp_dict})
+        entries[test] = tc_info
+        base_dict.setdefault(axis, {})[test] = tc_info
+
+    records, earliest, result_err_msg = _normalise_results(results, test_cases, set(cert_tc_list))
+    err_msg.extend(result_err_msg)
+    for record in records:
+        tc_info = entries[record.tc_id]
+        tc_info['start_time'] = record.start_time
+        tc_info['results'].append(record.success)
+
+    # Automatically pass selected onboarding tests
+    onboard_time = ''
+    if earliest:
+        try:
+            onboard_time = datetime.strptime(earliest, c.cicd_date_format)
+        except ValueError:
+            err_msg.append(f"The start time '{earliest}' of the test results is invalid.")
+        else:
+            onboard_time = onboard_time - timedelta(minutes=c.onboard_time_offset)
+            onboard_time = onboard_time.strftime(c.cicd_date_format)
+    for tc_id in c.onboarding_tests:
+        tc_info = entries.get(tc_id)
+        if tc_info is not None:
+            tc_info['start_time'] = onboard_time
+            tc_info['results'] = [True]
+
+    return base_dict, ' '.join(err_msg)
+
+
+class _TestResult:
+    """Result of a performed test, as needed for the certificate."""
+    __slots__ = ('tc_id', 'success', 'start_time')
+
+    def __init__(self, tc_id, success, start_time):
+        self.tc_id = tc_id
+        self.success = success
+        self.start_time = start_time
+
+
+# Length of a timestamp in cicd_date_format. Such timestamps (zero-padded, from year to second) compare like the
+# times they stand for, only timestamps of another length have to be parsed.
+_time_length = len(datetime(2000, 1, 1).strftime(c.cicd_date_format))
 
-    all_timestamps = []
+
+def _normalise_results(results, test_cases, cert_tc_set):
+    """Check the test results from the CI/CD Manager in a single pass and keep the results of the test cases required
+    for certification.
+
+    :param results: test results
+    :type results: Iterable[dict]
+    :param test_cases: test case info of the test bed
+    :type test_cases: dict
+    :param cert_tc_set: IDs of the tests required for certification
+    :type cert_tc_set: set[str]
+
+    :return: results of the required test cases, earliest start time of all results (in cicd_date_format, empty if
+             there is none), error messages
+    :rtype: list[_TestResult], str, list[str]
+    """
+    records = []
+    earliest = ''
+    err_msg = []
     msg_result = "For test result '{0}': Could not find the key '{1}' or its value '{2}' is invalid."
     for test in results:
         if test.get('is_developer_defined'):
@@ -117,37 +167,24 @@ def _build_base_dictionary(base_info, results, test_cases, cert_tc_list):
         if not start_time:
             err_msg.append(msg_result.format(performed, 'start_time', start_time))
         else:
-            all_timestamps.append(start_time)
+            sortable = start_time
+            if len(start_time) != _time_length:
+                try:
+                    sortable = datetime.strptime(start_time, c.cicd_date_format).strftime(c.cicd_date_format)
+                except (TypeError, ValueError):
+                    sortable = ''
+                    err_msg.append(msg_result.format(performed, 'start_time', start_time))
+            if sortable and (not earliest or sortable < earliest):
+                earliest = sortable
         tc_id = test.get('original_test_name')
         if not tc_id:
             err_msg.append(msg_result.format(performed, 'original_test_name', tc_id))
-        else:
-            tc = test_cases.get(tc_id)
+        elif not test_cases.get(tc_id):
+            err_msg.append(f"Could not find test '{tc_id}' in test case database (/tests/all).")
+        elif tc_id in cert_tc_set:
             # Save result if test is required for certification
-            if tc and tc_id in cert_tc_list:
-                axis = tc.get('axis')
-                tmp_dict = base_dict.get(axis, {}).get(tc_id, {})
-                tmp_dict['start_time'] = start_time
-                tmp_result = tmp_dict.get('results', [])
-                tmp_result.append(tc_result)
-            elif not tc:
-                err_msg.append(f"Could not find test '{tc_id}' in test case database (/tests/all).")
-
-    # Automatically pass selected onboarding tests
-    timestamps = [datetime.strptime(x, c.cicd_date_format) for x in all_timestamps]
-    timestamps.sort()
-    onboard_time = timestamps[0] if timestamps else ''
-    if onboard_time:
-        onboard_time = onboard_time - timedelta(minutes=c.onboard_time_offset)
-        onboard_time = onboard_time.strftime(c.cicd_date_format)
-    for tc_id in c.onboarding_tests:
-        tc = test_cases.get(tc_id)
-        axis = tc.get('axis')
-        tmp_dict = base_dict.get(axis, {}).get(tc_id, {})
-        tmp_dict['start_time'] = onboard_time
-        tmp_dict['results'] = [True]
-
-    return base_dict, ' '.join(err_msg)
+            records.append(_TestResult(tc_id, tc_result, start_time))
+    return records, earliest, err_msg
 
 
 def _calculate_axis_scores(base_dict):
@@ -188,8 +225,8 @@ def _calculate_axis_scores(base_dict):
                     o_result_sum = o_result_sum + info['weight']
 
         # No required tests, set axis score to -1
-        logger.debug(f"--- Axis: {axis}, mandatory tests number: {m_num_passed}/{m_num_tests}, "
-                     f"conditional test weights: {o_result_sum}/{o_weight_sum}")
+        logger.debug("--- Axis: %s, mandatory tests number: %s/%s, conditional test weights: %s/%s", axis, m_num_passed,
+                     m_num_tests, o_result_sum, o_weight_sum)
         if m_num_tests == 0 and o_weight_sum == 0:
             axis_scores.update({axis: -1})
         else:
@@ -200,73 +237,64 @@ def _calculate_axis_scores(base_dict):
     return axis_scores, min_req
 
 
-def _create_radar_chart(axis_scores, filename, show_min=None):
-    """Plot a radar chart with the given scores.
-    https://www.pythoncharts.com/matplotlib/radar-charts/
+def _create_radar_chart(axis_scores, show_min=None, image=None):
+    """Plot a radar chart with the given scores, as PNG image or as inline SVG depending on constants.chart_backend.
+    The PNG image is named after the content address of the chart.
 
     :param axis_scores: dictionary of axis scores
     :type axis_scores: dict
-    :param filename: filename for the chart
-    :type filename: str
     :param show_min: dictionary for drawing minimum requirements in the chart
     :type show_min: dict
+    :param image: PNG image of the chart if it was already rendered, e.g. from the chart cache of the worker
+    :type image: bytes
+
+    :return: HTML element of the chart for the certificate, filename and PNG image of the chart (empty for SVG)
+    :rtype: str, str, bytes
     """
-    logger.debug(f"Create radar chart '{filename}'")
-    matplotlib.use('Agg')  # non-interactive backend
-
-    labels = []
-    scores = []
-    for axis, score in axis_scores.items():
-        labels.append(c.axis_names[axis])
-        scores.append(score)
-    num_vars = len(labels)
-    # Split the circle into even parts and save the angles.
-    angles = np.linspace(0, 2 * np.pi, num_vars, endpoint=False).tolist()
-
-    fig, ax = plt.subplots(figsize=(5, 5), subplot_kw=dict(polar=True))
-    draw_angles = angles[:]
-    draw_angles.append(angles[0])
-    # Draw minimum requirements
-    if show_min:
-        min_values = [show_min.get(x, 0) for x in axis_scores.keys()]
-        min_values.append(min_values[0])
-        ax.plot(draw_angles, min_values, color='orange', linewidth=1, label='Minimum requirements')
-        ax.fill(draw_angles, min_values, color='orange', alpha=0.25)
-    # Draw scores
-    draw_m_values = [x if x >= 0 else 0 for x in scores]
-    draw_m_values.append(scores[0])
-    ax.plot(draw_angles, draw_m_values, color='blue', linewidth=2, label='Achieved score')
-    ax.fill(draw_angles, draw_m_values, color='blue', alpha=0.25)
-    # Create legend
-    ax.legend(bbox_to_anchor=(1, 0, 0.8, 1))
-    # Fix axis to go in the right order and start at 12 o'clock.
-    ax.set_theta_offset(np.pi / 2)
-    ax.set_theta_direction(-1)
-    # Draw axis lines for each angle and label.
-    ax.set_thetagrids(np.degrees(angles), labels)
-
-    # Go through labels and adjust alignment based on where it is in the circle.
-    for label, angle in zip(ax.get_xticklabels(), angles):
-        if angle in (0, np.pi):
-            label.set_horizontalalignment('center')
-        elif 0 < angle < np.pi:
-            label.set_horizontalalignment('left')
-        else:
-            label.set_horizontalalignment('right')
-    # Ensure radar goes from 0 to 10.
-    ax.set_ylim(0, 10)
-    # Set position of y-labels (0-10) to be in the middle of the first two axes.
-    ax.set_rlabel_position(180 / num_vars)
-    # Make the y-axis (0-100) labels smaller.
-    ax.tick_params(axis='y', labelsize=9)
+    if c.chart_backend == 'svg':
+        logger.debug("Created radar chart as SVG")
+        return chart.render_radar_chart_svg(axis_scores, show_min), '', b''
+
+    filename = f"radar_chart_{chart.chart_key(axis_scores, show_min)}.png"
+    if image is None:
+        image = chart.render_radar_chart(axis_scores, show_min)
+        logger.debug("Created radar chart '%s'", filename)
+    return f'<img src="{filename}" class="img-center"/>', filename, image
 
-    # Save plot as PNG file.
-    file = os.path.join(c.cert_files_dir, filename)
-    fig.savefig(file, bbox_inches='tight')
-    logger.debug(f"Created radar chart '{filename}'")
 
+def _table_rows(base_dict, test_bed):
+    """Generate the entries of the test case table one by one.
 
-def _generate_certificate(base_dict, axis_scores, base_info, chart_file, filename):
+    :param base_dict: dictionary from _build_base_dictionary()
+    :type base_dict: dict
+    :param test_bed: test bed name
+    :type test_bed: str
+
+    :rtype: Iterator[dict]
+    """
+    for axis, tests in base_dict.items():
+        for test, info in tests.items():
+            if len(info['results']) == 0:
+                result = 'Not tested'
+                colour = c.grey
+            elif all(info['results']):
+                result = 'Passed'
+                colour = c.green
+            else:
+                result = 'Failed'
+                colour = c.red
+            yield {
+                'start_time': info['start_time'],
+                'axis': c.axis_names[axis],
+                'name': info['name'],
+                'type': 'Mandatory' if info['mandatory'] else 'Conditional',
+                'test_bed': test_bed,
+                'result': result,
+                'colour': colour,
+            }
+
+
+def _generate_certificate(base_dict, axis_scores, base_info, test_bed, chart_html, filename):
     """Generate a certificate based on the axis scores and grading definition. If the minimum grade of bronze is not
     achieved, create a document with the intermediary results.
 
@@ -276,16 +304,19 @@ def _generate_certificate(base_dict, axis_scores, base_info, chart_file, filenam
     :type axis_scores: dict
     :param base_info: basic info about the testing
     :type base_info: dict
-    :param chart_file: filename of the chart to include
-    :type chart_file: str
+    :param test_bed: test bed name
+    :type test_bed: str
+    :param chart_html: HTML element of the chart to include
+    :type chart_html: str
     :param filename: base filename for the document
     :type filename: path-like
 
-    :return: True if document is certificate, else False (intermediary result) and filename of the document
-    :rtype: bool, str
+    :return: True if document is certificate, else False (intermediary result), filename of the document and
+             the document as HTML
+    :rtype: bool, str, str
     """
     msg_prefix = f"test_id '{base_info['test_id']}'"
-    logger.debug(f"{msg_prefix}: Start creating certificate with scores: {axis_scores}")
+    logger.debug("%s: Start creating certificate with scores: %s", msg_prefix, axis_scores)
     # Determine grade (if score is -1, ignore this axis for grading)
     gold = [True if v >= c.score_gold or v == -1 else False for k, v in axis_scores.items()]
     silver = [True if v >= c.score_silver or v == -1 else False for k, v in axis_scores.items()]
@@ -299,42 +330,6 @@ def _generate_certificate(base_dict, axis_scores, base_info, chart_file, filenam
     else:
         grade = ""
 
-    # Create test case table entries
-    test_bed = _get_testbed_name(base_info['testbed_id'])
-    row_format = """\
-<tr>
-    <td>{0}</td>
-    <td>{1}</td>
-    <td>{2}</td>
-    <td>{3}</td>
-    <td>{4}</td>
-    <td style="background-color:{colour}">{5}</td>
-</tr>
-"""
-    rows = []
-    for axis, tests in base_dict.items():
-        for test, info in tests.items():
-            is_mandatory = info['mandatory']
-            if len(info['results']) == 0:
-                result = 'Not tested'
-                colour = c.grey
-            elif all(info['results']):
-                result = 'Passed'
-                colour = c.green
-            else:
-                result = 'Failed'
-                colour = c.red
-            row = row_format.format(
-                info['start_time'],
-                c.axis_names[axis],
-                info['name'],
-                'Mandatory' if is_mandatory else 'Conditional',
-                test_bed,
-                result,
-                colour=colour,
-            )
-            rows.append(row)
-
     current_date = date.today().strftime(c.sign_date_format)
     tc_link = f"{c.cicd_service_page}?test_id={base_info['test_id']}&access_token={base_info['access_token']}"
     if grade:
@@ -348,39 +343,28 @@ def _generate_certificate(base_dict, axis_scores, base_info, chart_file, filenam
         doc_type = 'Intermediary result'
         doc_filename = f'result_{filename}'
 
-    with open(template_file, 'r', encoding='utf-8') as f:
-        template = string.Template(f.read())
-    # Generate certificate part for test conditions
     condition_names = [c.test_conditions.get(x, 'Undefined') for x in base_info['test_conditions']]
-    condition_str = [f'<i>{x}</i><br>' for x in sorted(condition_names)]
-    has_conditions = f"""\
-<p>Under the test conditions</p>
-<ul>{''.join(condition_str)}</ul>
-"""
-    no_conditions = "<p>With no selected test conditions</p>"
-    cert = template.substitute(
+    cert = templates.render(
+        template_file,
         grade=grade,
         app_name=base_info['app_name'],
         app_version=base_info['app_version'],
         author=base_info['app_author'],
-        conditions=has_conditions if base_info['test_conditions'] else no_conditions,
-        chart=chart_file,
-        test_cases=''.join(rows),
+        conditions=sorted(condition_names),
+        chart=Markup(chart_html),
+        test_cases=_table_rows(base_dict, test_bed),
         tc_link=Markup(tc_link),
         env_info=Markup(base_info['service_order']),
         sign_date=current_date,
     )
-    file = os.path.join(c.cert_files_dir, f'{doc_filename}.html')
-    with open(file, 'w', encoding='utf-8') as f:
-        f.write(cert)
-    logger.debug(f"{msg_prefix}: {doc_type} created")
-    return is_cert, doc_filename
+    logger.debug("%s: %s created", msg_prefix, doc_type)
+    return is_cert, doc_filename, cert
 
 
 def get_test_info(info_type, test_id, access_token):
     """Query data from the CI/CD Manager.
 
-    :param info_type: the type of data to query, one of: base, results, test_cases
+    :param info_type: the type of data to query, one of: base, results
     :type info_type: str
     :param test_id:
     :type test_id: int
@@ -400,31 +384,77 @@ def get_test_info(info_type, test_id, access_token):
     elif info_type == 'results':
         uri = '/gui/tests-performed'
         params = params
-    elif info_type == 'test_cases':
-        uri = '/tests/all'
-        params = {}
     else:
         return {}, "Unknown info type"
     msg_prefix = f"test_id '{test_id}' with '{uri}'"
 
-    logger.debug(f"{msg_prefix}: Get data")
-    try:
-        response = requests.get(f'{c.cicd_manager_base}{uri}', params=params)
-        if response.status_code == 200:
-            payload = response.json()
-            logger.debug(f"{msg_prefix}: Received data: {payload}")
-            data = payload.get('data')
-            return data, ""
-        else:
-            err_msg = f"Could not get data from CI/CD Manager: <{response.status_code}> {response.text}."
-            logger.error(f"{msg_prefix}: {err_msg}")
-    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
-        err_msg = "Cannot connect to CI/CD Manager."
-        logger.error(f"{err_msg}: {e}")
-    except requests.exceptions.JSONDecodeError as e:
-        err_msg = f"Response from {uri} could not be JSON decoded."
-        logger.error(f"{err_msg}: {e}")
-    return {}, err_msg
+    logger.debug("%s: Get data", msg_prefix)
+    # The performed tests are parsed while they are read, see streaming.py
+    if info_type == 'results':
+        data, err_msg = cicd_client.get_json(uri, msg_prefix, parse=lambda r: streaming.performed_tests(r, uri),
+                                             params=params, stream=streaming.enabled())
+        if not err_msg:
+            logger.debug("%s: Received %d performed tests", msg_prefix, len(data or []))
+    else:
+        data, err_msg = cicd_client.get_json(uri, msg_prefix, params=params)
+        if not err_msg:
+            logger.debug("%s: Received data: %s", msg_prefix, log.Payload(data))
+    if err_msg:
+        return {}, err_msg
+    return data, ""
+
+
+def fetch_test_info(test_id, access_token, prefetched=None):
+    """Query all data required for a certificate from the CI/CD Manager. The requests are independent and are issued
+    concurrently, so the latency is the one of the slowest request instead of the sum.
+    The test cases are taken from the test catalog cache, only for the test bed of the testing.
+
+    :param test_id:
+    :type test_id: int
+    :param access_token:
+    :type access_token: str
+    :param prefetched: (data dictionary, error message) for each of: base, results, from fetch_batch_test_info(); only
+                       the test cases are taken from the catalog then
+    :type prefetched: ((dict, str), (dict, str))
+
+    :return: (data dictionary, error message) for each of: base, results, test_cases
+    :rtype: ((dict, str), (dict, str), (dict, str))
+    """
+    if prefetched:
+        (base_info, base_err_msg), (results, results_err_msg) = prefetched
+        err_msg = catalog.sync()
+    else:
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            base = executor.submit(tracing.bind(get_test_info), 'base', test_id, access_token)
+            results = executor.submit(tracing.bind(get_test_info), 'results', test_id, access_token)
+            synced = executor.submit(tracing.bind(catalog.sync))
+        base_info, base_err_msg = base.result()
+        results, results_err_msg = results.result()
+        err_msg = synced.result()
+    test_cases = {}
+    test_bed = base_info.get('testbed_id') if base_info else None
+    if test_bed and not err_msg:
+        tests, err_msg = catalog.get_tests(test_bed)
+        test_cases = {'tests': {test_bed: tests}}
+    return (base_info, base_err_msg), (results, results_err_msg), (test_cases, err_msg)
+
+
+def fetch_batch_test_info(testings):
+    """Query the base info and test results of several testings from the CI/CD Manager concurrently, using all
+    connections of the CI/CD Manager client. The test catalog is synchronised once for all testings meanwhile.
+
+    :param testings: test_id and access_token of each testing
+    :type testings: list[(int, str)]
+
+    :return: (data dictionary, error message) for each of: base, results, for each testing
+    :rtype: list[((dict, str), (dict, str))]
+    """
+    with ThreadPoolExecutor(max_workers=c.cicd_pool_size) as executor:
+        executor.submit(tracing.bind(catalog.sync))
+        futures = [(executor.submit(tracing.bind(get_test_info), 'base', test_id, access_token),
+                    executor.submit(tracing.bind(get_test_info), 'results', test_id, access_token))
+                   for test_id, access_token in testings]
+    return [(base.result(), results.result()) for base, results in futures]
 
 
 def get_test_conditions(results, test_data, test_bed):
@@ -440,59 +470,183 @@ def get_test_conditions(results, test_data, test_bed):
     :return: list of test conditions
     :rtype: list[int]
     """
-    conditions = []
     test_bed_tests = test_data.get('tests', {}).get(test_bed)
     if not test_bed_tests:
-        logger.warn(f"No test cases were found for test bed ID '{test_bed}' in data from /tests/all.")
+        logger.warning("No test cases were found for test bed ID '%s' in data from /tests/all.", test_bed)
         return []
+    index, _ = catalog.get_index(test_bed, test_bed_tests)
+    mask = 0
     for result in results:
         test_id = result.get('original_test_name')
         if test_id == 'developer-defined':
             continue
-        test_case = test_bed_tests.get(test_id)
-        if test_case:
-            conditions.extend(test_case.get('test_conditions', []))
+        tc_mask = index.masks.get(test_id)
+        if tc_mask is not None:
+            mask |= tc_mask
         else:
-            logger.warn(f"Test case '{test_id}' not found in test info for test bed '{test_bed}'.")
-    return sorted(set(conditions))
+            logger.warning("Test case '%s' not found in test info for test bed '%s'.", test_id, test_bed)
+    return index.conditions(mask)
 
 
-def get_test_cases(test_conditions, test_bed):
-    """Return a list of test case IDs according to the specified test conditions.
+def get_test_cases(test_conditions, test_bed, test_cases=None):
+    """Return a list of test case IDs according to the specified test conditions. The list is taken from the condition
+    index of the test bed, it must not be modified.
 
     :param test_conditions: list of test conditions
     :type test_conditions: list[int]
     :param test_bed: test bed ID
     :type test_bed: str
+    :param test_cases: test case info from /tests/all, taken from the test catalog cache if not given
+    :type test_cases: dict
 
     :return: list of test case IDs and error message if an error occurred
     :rtype: (list[str], str)
     """
-    test_cases, err_msg = get_test_info('test_cases', -1, '')
-    if test_cases:
-        tc_data = test_cases.get('tests', {}).get(test_bed, {})
-        if tc_data:
-            final_list = []
-            if len(test_conditions) == 0:
-                final_list = [v.get('id') for k, v in tc_data.items() if v.get('mandatory') is True]
-            else:
-                conditions_set = set(test_conditions)
-                for _, test_data in tc_data.items():
-                    if test_data.get('mandatory') is True:
-                        final_list.append(test_data.get('id'))
-                    else:
-                        tc_cond = set(test_data.get('test_conditions', []))
-                        if tc_cond and tc_cond.issubset(conditions_set):
-                            final_list.append(test_data.get('id'))
-            return final_list, ""
-        else:
-            return [], f"No test cases found for test bed '{test_bed}'."
+    if test_cases is None:
+        index, err_msg = catalog.get_index(test_bed)
+        if err_msg:
+            return [], err_msg
+    elif test_cases:
+        index, _ = catalog.get_index(test_bed, test_cases.get('tests', {}).get(test_bed, {}))
     else:
-        return [], err_msg
+        return [], ''
+    if not index.entries:
+        return [], f"No test cases found for test bed '{test_bed}'."
+    return index.select(test_conditions), ""
+
+
+def _document_digest(base_dict, axis_scores, min_req, base_info, test_bed):
+    """Return the content address of a document: a digest over everything that goes into it, i.e. the test results
+    and scores, the fields of the testing shown in the document, the version of the templates and the chart backend.
+    The signing date is not included, an existing document keeps the date it was signed on.
+
+    :param base_dict: dictionary from _build_base_dictionary()
+    :type base_dict: dict
+    :param axis_scores: score dictionary from _calculate_axis_scores()
+    :type axis_scores: dict
+    :param min_req: minimum requirements from _calculate_axis_scores()
+    :type min_req: dict
+    :param base_info: basic info about the testing
+    :type base_info: dict
+    :param test_bed: test bed name
+    :type test_bed: str
+
+    :rtype: str
+    """
+    inputs = {
+        'base_dict': base_dict,
+        'scores': axis_scores,
+        'min_req': min_req,
+        'info': {x: base_info.get(x) for x in c.document_info_fields},
+        'test_bed': test_bed,
+        'templates': templates.version(),
+        'chart_backend': c.chart_backend,
+    }
+    canonical = json.dumps(inputs, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _stored_document(digest):
+    """Return the info of a rendered document with the given digest, if its file still exists.
+
+    :rtype: dict or None
+    """
+    data = mRedis.hget(c.document_key, digest)
+    if not data:
+        return None
+    document = json.loads(data)
+    try:
+        # Mark the document as used, so it is not evicted before the creation refers to it, see evict_documents()
+        os.utime(os.path.join(c.cert_files_dir, f"{document['file']}.pdf"))
+    except FileNotFoundError:
+        return None
+    return document
+
+
+def evict_documents():
+    """Delete the rendered documents which no certificate creation refers to anymore, e.g. after a testing was
+    certified again with other results or access token. Documents which were written or used less than
+    document_grace_period seconds ago are kept, a running creation may be about to refer to them.
+
+    :return: number of deleted documents
+    :rtype: int
+    """
+    referenced = store.document_files()
+    cutoff = time.time() - c.document_grace_period
+    evicted = 0
+    for entry in os.scandir(c.document_dir):
+        file = os.path.join(os.path.basename(c.document_dir), entry.name)
+        if file in referenced or entry.stat().st_mtime > cutoff:
+            continue
+        if entry.name.endswith('.pdf'):
+            # Not found by new creations from now on. A creation which found it just before has updated its time.
+            mRedis.hdel(c.document_key, entry.name[:-len('.pdf')])
+            try:
+                if os.stat(entry.path).st_mtime > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+        try:
+            os.unlink(entry.path)
+            evicted += 1
+        except FileNotFoundError:
+            pass
+    # Entries of documents whose files are gone
+    for digest, data in mRedis.hscan_iter(c.document_key, count=1000):
+        if not os.path.exists(os.path.join(c.cert_files_dir, f"{json.loads(data)['file']}.pdf")):
+            mRedis.hdel(c.document_key, digest)
+    if evicted:
+        logger.info("Evicted %d documents which no certificate creation refers to", evicted)
+    return evicted
+
+
+def render_document(base_dict, axis_scores, min_req, base_info, test_bed, chart_image=None):
+    """Render stage of a certificate: draw the chart, fill the template and render the document as PDF. Runs in a
+    render process, see render_client.py.
+
+    :param base_dict: dictionary from _build_base_dictionary()
+    :type base_dict: dict
+    :param axis_scores: score dictionary from _calculate_axis_scores()
+    :type axis_scores: dict
+    :param min_req: minimum requirements from _calculate_axis_scores()
+    :type min_req: dict
+    :param base_info: basic info about the testing
+    :type base_info: dict
+    :param test_bed: test bed name
+    :type test_bed: str
+    :param chart_image: PNG image of the radar chart from the chart cache of the worker, rendered here if not given
+    :type chart_image: bytes
+
+    :return: True if document is certificate, else False, filename of the radar chart, name of the document, the
+             document as PDF and the PNG image of the radar chart (empty for SVG)
+    :rtype: bool, str, str, bytes, bytes
+    """
+    with metrics.stage('chart'):
+        chart_html, radar_chart, chart_image = _create_radar_chart(axis_scores, show_min=min_req, image=chart_image)
+    filename_base = f"{base_info['netapp_id']}_{base_info['app_version']}"
+    with metrics.stage('template'):
+        is_cert, filename, html = _generate_certificate(base_dict, axis_scores, base_info, test_bed, chart_html,
+                                                        filename_base)
+
+    with metrics.stage('pdf'):
+        pdf = render.html_to_pdf(html, {radar_chart: chart_image} if chart_image else None)
+    return is_cert, radar_chart, filename, pdf, chart_image
+
+
+def _write_document(doc_file, pdf):
+    # Write under a temporary name, another worker may write the same document meanwhile
+    doc_pdf = os.path.join(c.cert_files_dir, f'{doc_file}.pdf')
+    tmp_file = f"{doc_pdf}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(pdf)
+    os.replace(tmp_file, doc_pdf)
 
 
 def create_certificate(base_info, results, test_cases):
     """Create a certificate for the given testing instance.
+    Documents are stored by the digest of their render inputs, if the same document was already rendered (e.g. the
+    testing is certified again) the stored one is returned without rendering. Otherwise, the document is rendered by
+    the renderer of this process (see render_client.py) and written to the document directory.
 
     :param base_info: basic info about the testing
     :type base_info: dict
@@ -501,26 +655,52 @@ def create_certificate(base_info, results, test_cases):
     :param test_cases: test case info
     :type test_cases: dict
 
-    :return: If successful, return if the document is a certificate and the filenames of radar chart and document.
+    :return: If successful, return if the document is a certificate, the filename of radar chart, the filename of the
+             document relative to the certificate directory and the name of the document for downloads.
              Otherwise, return an error message.
-    :rtype: (bool, str, str) or str
+    :rtype: (bool, str, str, str) or str
     """
-    cert_tc_list, _ = get_test_cases(base_info['test_conditions'], base_info.get('testbed_id'))
-    logger.debug(f"test_id {base_info['test_id']}: Certificate test list: {cert_tc_list}")
-    base_dict, err_msg = _build_base_dictionary(base_info, results, test_cases, cert_tc_list)
+    msg_prefix = f"test_id '{base_info['test_id']}'"
+    cert_tc_list, _ = get_test_cases(base_info['test_conditions'], base_info.get('testbed_id'), test_cases)
+    logger.debug("%s: Certificate test list: %s", msg_prefix, log.Payload(cert_tc_list))
+    with metrics.stage('base_dictionary'):
+        base_dict, err_msg = _build_base_dictionary(base_info, results, test_cases, cert_tc_list)
     if err_msg:
         return err_msg
-    scores, m_min_req = _calculate_axis_scores(base_dict)
-    radar_chart = f"{base_info['test_id']}_radar_chart.png"
-    _create_radar_chart(scores, radar_chart, show_min=m_min_req)
-    filename_base = f"{base_info['netapp_id']}_{base_info['app_version']}"
-    is_cert, filename = _generate_certificate(base_dict, scores, base_info, radar_chart, filename_base)
-
-    doc_html = os.path.join(c.cert_files_dir, f'{filename}.html')
-    doc_pdf = os.path.join(c.cert_files_dir, f'{filename}.pdf')
-    if os.path.isfile(doc_html):
-        HTML(filename=doc_html).write_pdf(doc_pdf)
-        os.remove(doc_html)
-        return is_cert, radar_chart, filename
-    else:
-        return "Unexpected error, could not find the certificate or result file."
+    with metrics.stage('axis_scores'):
+        scores, m_min_req = _calculate_axis_scores(base_dict)
+    test_bed = testbeds.get_name(base_info['testbed_id'])
+    digest = _document_digest(base_dict, scores, m_min_req, base_info, test_bed)
+    document = _stored_document(digest)
+    metrics.cache('document', bool(document))
+    if document:
+        logger.info("%s: Document '%s' with the same content exists, not rendered again", msg_prefix, document['file'])
+        return document['is_cert'], document['chart'], document['file'], document['name']
+
+    doc_file = os.path.join(os.path.basename(c.document_dir), digest)
+    chart_key = chart_image = None
+    if c.chart_backend != 'svg':
+        # The render processes are replaced regularly, the charts are cached here and passed to the render
+        chart_key = chart.chart_key(scores, m_min_req)
+        chart_image = chart.cache.get(chart_key)
+    cached_chart = chart_image is not None
+    # The renderer (render pool or renderer service) is only imported by the worker, the API processes do not render
+    from swagger_server import render_client
+    try:
+        with metrics.task('render'), metrics.stage('render'):
+            is_cert, radar_chart, filename, pdf, chart_image = render_client.get_renderer().render(
+                base_dict, scores, m_min_req, base_info, test_bed, chart_image)
+    except render_client.RenderError as e:
+        return f"Could not render the certificate: {e}"
+    if chart_key and chart_image and not cached_chart:
+        chart.cache.put(chart_key, chart_image)
+        logger.debug("%s: Chart cache: %s", msg_prefix, chart.cache.stats())
+    _write_document(doc_file, pdf)
+    document = {
+        'is_cert': is_cert,
+        'chart': radar_chart,
+        'file': doc_file,
+        'name': filename,
+    }
+    mRedis.hset(c.document_key, digest, json.dumps(document))
+    return is_cert, radar_chart, doc_file, filename
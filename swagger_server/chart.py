@@ -0,0 +1,258 @@
+"""
+Radar chart of the axis scores
+
+The chart does not use pyplot and its global state. Each process builds one Figure with the static parts of the chart
+(polar grid, axis labels, limits) and reuses it for every chart: only the polygons of the scores and the minimum
+requirements are drawn per chart and removed again after rendering.
+Rendered charts are cached by the content address of their scores, a repeated score profile is not rendered again.
+The cache is kept by the worker process, which passes a cached chart to the render: the render processes are replaced
+regularly and would each start with an empty cache.
+
+With the SVG backend (constants.chart_backend), the same chart is generated directly as SVG markup for the certificate
+template, without matplotlib.
+"""
+import hashlib
+import io
+import math
+import threading
+from collections import OrderedDict
+
+from xml.sax.saxutils import escape
+
+from swagger_server import constants as c
+from swagger_server import metrics
+from swagger_server import util
+
+
+class RadarChart:
+    """Radar chart with one axis per entry of constants.axis_names, clockwise from 12 o'clock.
+    https://www.pythoncharts.com/matplotlib/radar-charts/
+    """
+    def __init__(self):
+        self.axes = list(c.axis_names)
+        num_vars = len(self.axes)
+        # Split the circle into even parts and save the angles.
+        self.angles = [2 * math.pi * i / num_vars for i in range(num_vars)]
+        # matplotlib is only imported by processes which render PNG charts
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.figure = Figure(figsize=(5, 5))
+        FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot(polar=True)
+        self._lock = threading.Lock()
+
+        ax = self.ax
+        # Fix axis to go in the right order and start at 12 o'clock.
+        ax.set_theta_offset(math.pi / 2)
+        ax.set_theta_direction(-1)
+        # Draw axis lines for each angle and label.
+        ax.set_thetagrids([math.degrees(x) for x in self.angles], [c.axis_names[x] for x in self.axes])
+        # Go through labels and adjust alignment based on where it is in the circle.
+        for label, angle in zip(ax.get_xticklabels(), self.angles):
+            if angle in (0, math.pi):
+                label.set_horizontalalignment('center')
+            elif 0 < angle < math.pi:
+                label.set_horizontalalignment('left')
+            else:
+                label.set_horizontalalignment('right')
+        # Ensure radar goes from 0 to 10.
+        ax.set_ylim(0, 10)
+        # Set position of y-labels (0-10) to be in the middle of the first two axes.
+        ax.set_rlabel_position(180 / num_vars)
+        # Make the y-axis (0-10) labels smaller.
+        ax.tick_params(axis='y', labelsize=9)
+
+    def _polygon(self, values, color, linewidth, label):
+        # Close the polygon by going back to the first value
+        draw_angles = self.angles + self.angles[:1]
+        draw_values = values + values[:1]
+        artists = self.ax.plot(draw_angles, draw_values, color=color, linewidth=linewidth, label=label)
+        artists += self.ax.fill(draw_angles, draw_values, color=color, alpha=0.25)
+        return artists
+
+    def render(self, axis_scores, show_min=None):
+        """Render the chart for the given scores as PNG.
+
+        :param axis_scores: dictionary of axis scores
+        :type axis_scores: dict
+        :param show_min: dictionary for drawing minimum requirements in the chart
+        :type show_min: dict
+
+        :return: PNG image
+        :rtype: bytes
+        """
+        with self._lock:
+            artists = []
+            try:
+                # Draw minimum requirements
+                if show_min:
+                    min_values = [show_min.get(x, 0) for x in self.axes]
+                    artists += self._polygon(min_values, color='orange', linewidth=1, label='Minimum requirements')
+                # Draw scores
+                scores = [max(axis_scores.get(x, 0), 0) for x in self.axes]
+                artists += self._polygon(scores, color='blue', linewidth=2, label='Achieved score')
+                # Create legend
+                artists.append(self.ax.legend(bbox_to_anchor=(1, 0, 0.8, 1)))
+                output = io.BytesIO()
+                self.figure.savefig(output, format='png', bbox_inches='tight')
+                return output.getvalue()
+            finally:
+                for artist in artists:
+                    artist.remove()
+
+
+class ChartCache:
+    """LRU cache of rendered charts. There are only few distinct score profiles, so most charts can be reused.
+
+    :param max_size: maximum number of charts kept
+    :type max_size: int
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._charts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._charts.get(key)
+            if image is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._charts.move_to_end(key)
+        metrics.cache('chart', image is not None)
+        return image
+
+    def put(self, key, image):
+        with self._lock:
+            self._charts[key] = image
+            self._charts.move_to_end(key)
+            while len(self._charts) > self.max_size:
+                self._charts.popitem(last=False)
+
+    def stats(self):
+        """Return the hit and miss counters and the number of cached charts.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._charts)}
+
+
+def chart_key(axis_scores, show_min=None):
+    """Return the content address of a chart: a digest of the scores and minimum requirements in axis order.
+
+    :param axis_scores: dictionary of axis scores
+    :type axis_scores: dict
+    :param show_min: dictionary for drawing minimum requirements in the chart
+    :type show_min: dict
+
+    :rtype: str
+    """
+    scores = tuple(round(axis_scores.get(x, 0), 6) for x in c.axis_names)
+    min_req = tuple(round(show_min.get(x, 0), 6) for x in c.axis_names) if show_min else None
+    return hashlib.sha256(repr((scores, min_req)).encode()).hexdigest()[:32]
+
+
+# Used by the worker process, see cert_entity.create_certificate()
+cache = ChartCache(c.chart_cache_size)
+
+
+@util.per_process
+def _radar_chart():
+    # Figure of this process, see RadarChart
+    return RadarChart()
+
+
+def render_radar_chart(axis_scores, show_min=None):
+    """Render the radar chart for the given scores with the figure of this process.
+
+    :param axis_scores: dictionary of axis scores
+    :type axis_scores: dict
+    :param show_min: dictionary for drawing minimum requirements in the chart
+    :type show_min: dict
+
+    :return: PNG image
+    :rtype: bytes
+    """
+    return _radar_chart().render(axis_scores, show_min)
+
+
+# Layout of the SVG chart: center and radius of the grid, position of the legend
+_svg_cx, _svg_cy, _svg_radius = 370, 215, 160
+_svg_legend_x = 700
+
+
+def _svg_point(angle, value):
+    # Clockwise from 12 o'clock, like the PNG chart
+    r = _svg_radius * value / 10
+    return _svg_cx + r * math.sin(angle), _svg_cy - r * math.cos(angle)
+
+
+def _svg_polygon(angles, values, colour, width):
+    points = ' '.join('%.2f,%.2f' % _svg_point(a, v) for a, v in zip(angles, values))
+    return (f'<polygon points="{points}" fill="{colour}" fill-opacity="0.25" stroke="{colour}" '
+            f'stroke-width="{width}" stroke-linejoin="round"/>')
+
+
+def render_radar_chart_svg(axis_scores, show_min=None):
+    """Generate the radar chart for the given scores as inline SVG, with the same layout and colours as the PNG chart.
+
+    :param axis_scores: dictionary of axis scores
+    :type axis_scores: dict
+    :param show_min: dictionary for drawing minimum requirements in the chart
+    :type show_min: dict
+
+    :return: SVG element
+    :rtype: str
+    """
+    axes = list(c.axis_names)
+    num_vars = len(axes)
+    angles = [2 * math.pi * i / num_vars for i in range(num_vars)]
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 950 420" class="img-center" '
+             f'font-family="DejaVu Sans, sans-serif">']
+    # Polar grid from 0 to 10
+    for value in range(2, 11, 2):
+        stroke = 'black' if value == 10 else '#b0b0b0'
+        parts.append(f'<circle cx="{_svg_cx}" cy="{_svg_cy}" r="{_svg_radius * value / 10:.2f}" fill="none" '
+                     f'stroke="{stroke}" stroke-width="0.8"/>')
+    for axis, angle in zip(axes, angles):
+        x, y = _svg_point(angle, 10)
+        parts.append(f'<line x1="{_svg_cx}" y1="{_svg_cy}" x2="{x:.2f}" y2="{y:.2f}" stroke="#b0b0b0" '
+                     f'stroke-width="0.8"/>')
+        # Axis labels, aligned based on where they are in the circle
+        if angle in (0, math.pi):
+            anchor = 'middle'
+        elif 0 < angle < math.pi:
+            anchor = 'start'
+        else:
+            anchor = 'end'
+        x, y = _svg_point(angle, 11.2)
+        parts.append(f'<text x="{x:.2f}" y="{y + 5:.2f}" font-size="14" text-anchor="{anchor}">'
+                     f'{escape(c.axis_names[axis])}</text>')
+    # Labels of the grid in the middle of the first two axes
+    label_angle = math.pi / num_vars
+    for value in range(2, 11, 2):
+        x, y = _svg_point(label_angle, value)
+        parts.append(f'<text x="{x + 3:.2f}" y="{y - 3:.2f}" font-size="10">{value}</text>')
+    # Draw minimum requirements and scores
+    legend = []
+    if show_min:
+        min_values = [show_min.get(x, 0) for x in axes]
+        parts.append(_svg_polygon(angles, min_values, 'orange', 1))
+        legend.append(('orange', 1, 'Minimum requirements'))
+    scores = [max(axis_scores.get(x, 0), 0) for x in axes]
+    parts.append(_svg_polygon(angles, scores, 'blue', 2))
+    legend.append(('blue', 2, 'Achieved score'))
+    # Create legend
+    parts.append(f'<rect x="{_svg_legend_x}" y="20" width="240" height="{12 + 24 * len(legend)}" fill="white" '
+                 f'stroke="#d0d0d0" rx="3"/>')
+    for i, (colour, width, label) in enumerate(legend):
+        x, y = _svg_legend_x + 10, 38 + 24 * i
+        parts.append(f'<line x1="{x}" y1="{y}" x2="{x + 30}" y2="{y}" stroke="{colour}" stroke-width="{width}"/>')
+        parts.append(f'<text x="{x + 40}" y="{y + 5}" font-size="14">{escape(label)}</text>')
+    parts.append('</svg>')
+    return ''.join(parts)
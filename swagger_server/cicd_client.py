@@ -0,0 +1,192 @@
+"""
+Client for the CI/CD Manager
+
+All requests to the CI/CD Manager go through one client per process. It keeps a persistent session with a pool of
+keep-alive connections, uses a timeout per endpoint and retries failed requests with a jittered exponential backoff.
+After too many failed calls in a row, a circuit breaker opens for all processes (shared in Redis), and calls fail fast
+with CicdManagerUnavailable until the reset timeout has passed.
+get_json sends a request with the client and turns all failures into an error message, which is logged.
+"""
+import random
+import threading
+import time
+
+import requests
+import requests.exceptions
+from requests.adapters import HTTPAdapter
+
+from swagger_server import constants as c
+from swagger_server import log
+from swagger_server import tracing
+from swagger_server import util
+from swagger_server.controllers.__init__ import logger, mRedis
+
+
+class CicdManagerUnavailable(requests.exceptions.ConnectionError):
+    """The circuit breaker is open, the CI/CD Manager is not called."""
+
+
+class CircuitBreaker:
+    """Count failed calls in a row and open the circuit for all processes after failure_threshold failures.
+
+    :param failure_threshold: number of failed calls in a row after which the circuit opens
+    :type failure_threshold: int
+    :param reset_timeout: seconds until calls are tried again
+    :type reset_timeout: int
+    """
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        return bool(mRedis.exists(c.cicd_circuit_key))
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures < self.failure_threshold:
+                return
+            self._failures = 0
+        mRedis.set(c.cicd_circuit_key, time.time(), ex=self.reset_timeout)
+        logger.error("CI/CD Manager failed %d times in a row, not calling it for %d seconds", self.failure_threshold,
+                     self.reset_timeout)
+
+
+class CicdManagerClient:
+    """Client for the CI/CD Manager.
+
+    :param base_url: base URL of the CI/CD Manager
+    :type base_url: str
+    """
+    def __init__(self, base_url=None):
+        self.base_url = base_url or c.cicd_manager_base
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=c.cicd_pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.breaker = CircuitBreaker(c.cicd_breaker_threshold, c.cicd_breaker_reset)
+
+    def available(self):
+        """Return False while the circuit breaker is open.
+
+        :rtype: bool
+        """
+        return not self.breaker.is_open()
+
+    def get(self, uri, params=None, headers=None, stream=False, retries=None):
+        """Send a GET request to the CI/CD Manager. Connection errors, timeouts and 5xx responses are retried.
+
+        :param uri: path of the endpoint, e.g. '/tests/all'
+        :type uri: str
+        :param params: query parameters
+        :type params: dict
+        :param headers: request headers
+        :type headers: dict
+        :param stream: do not read the body yet, it must be read or the response closed to release the connection
+        :type stream: bool
+        :param retries: retries after the first try, constants.cicd_retries if not given
+        :type retries: int
+
+        :return: the response, also if the last try was a 5xx response
+        :rtype: requests.Response
+        :raises CicdManagerUnavailable: if the circuit breaker is open
+        :raises requests.exceptions.ConnectionError, requests.exceptions.Timeout: if the last try failed
+        """
+        if self.breaker.is_open():
+            raise CicdManagerUnavailable(f"CI/CD Manager is unavailable, requests are paused for up to "
+                                         f"{self.breaker.reset_timeout} seconds after repeated failures.")
+        with tracing.span(f"GET {uri}") as span:
+            response = self._get(uri, params, headers, stream, c.cicd_retries if retries is None else retries)
+            if span is not None:
+                span.attributes['status_code'] = response.status_code
+            return response
+
+    def _get(self, uri, params, headers, stream, retries):
+        timeout = c.cicd_timeouts.get(uri, c.cicd_timeouts['default'])
+        for attempt in range(retries + 1):
+            last_try = attempt == retries
+            try:
+                response = self.session.get(f'{self.base_url}{uri}', params=params, headers=headers,
+                                            timeout=timeout, stream=stream)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if last_try:
+                    self.breaker.record_failure()
+                    raise
+                logger.warning("Request to '%s' failed, retrying: %s", uri, e)
+            else:
+                if response.status_code < 500:
+                    self.breaker.record_success()
+                    return response
+                if last_try:
+                    self.breaker.record_failure()
+                    return response
+                response.close()
+                logger.warning("Request to '%s' returned <%d>, retrying", uri, response.status_code)
+            # Full jitter, so retries of many workers do not arrive at the same time
+            time.sleep(random.uniform(0, c.cicd_retry_backoff * 2 ** attempt))
+
+
+@util.per_process
+def get_client():
+    """Return the client of this process. A forked process creates its own, sessions must not be shared.
+
+    :rtype: CicdManagerClient
+    """
+    return CicdManagerClient()
+
+
+def _data(response):
+    return response.json().get('data')
+
+
+def get_json(uri, msg_prefix, parse=None, params=None, headers=None, stream=False, statuses=(200,), retries=None):
+    """Send a GET request to the CI/CD Manager and decode the response. Failures are logged and returned as an error
+    message.
+
+    :param uri: path of the endpoint, e.g. '/tests/all'
+    :type uri: str
+    :param msg_prefix: prefix of the logged error messages
+    :type msg_prefix: str
+    :param parse: function which returns the data of a response, by default the 'data' field of the JSON body. It may
+        raise KeyError or TypeError if the response does not contain the expected data.
+    :type parse: callable
+    :param params: query parameters
+    :type params: dict
+    :param headers: request headers
+    :type headers: dict
+    :param stream: do not read the body before calling parse
+    :type stream: bool
+    :param statuses: status codes of a successful response
+    :type statuses: tuple[int]
+    :param retries: retries after the first try, constants.cicd_retries if not given
+    :type retries: int
+
+    :return: data (None on error), error message
+    :rtype: object, str
+    """
+    try:
+        with get_client().get(uri, params=params, headers=headers, stream=stream, retries=retries) as response:
+            if response.status_code not in statuses:
+                err_msg = f"Could not get data from CI/CD Manager: <{response.status_code}> {response.text}."
+                logger.error("%s: %s", msg_prefix, log.Payload(err_msg))
+                return None, err_msg
+            return (parse or _data)(response), ""
+    except CicdManagerUnavailable as e:
+        err_msg = str(e)
+        logger.error("%s: %s", msg_prefix, log.Payload(err_msg))
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        err_msg = "Cannot connect to CI/CD Manager."
+        logger.error("%s: %s: %s", msg_prefix, err_msg, e)
+    except requests.exceptions.JSONDecodeError as e:
+        err_msg = f"Response from {uri} could not be JSON decoded."
+        logger.error("%s: %s: %s", msg_prefix, err_msg, e)
+    except (KeyError, TypeError) as e:
+        err_msg = f"Response from {uri} does not contain the expected data."
+        logger.error("%s: %s: %s", msg_prefix, err_msg, log.Payload(repr(e)))
+    return None, err_msg
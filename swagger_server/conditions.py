@@ -0,0 +1,73 @@
+"""
+Condition index of a test bed
+
+The test conditions of each test case are kept as a bit mask, with one bit per condition of constants.test_conditions
+(and further bits for conditions of the catalog which are not defined there). A test case is required for a set of
+conditions if it is mandatory, or if it has conditions and all of them are in the set. The selection for each mask is
+memoised, so there are at most 2^10 selections to compute for the defined conditions.
+"""
+from swagger_server import constants as c
+
+
+class ConditionIndex:
+    """Index of the test cases of a test bed by their test conditions.
+
+    :param tests: test case info of a test bed from the catalog
+    :type tests: dict
+    """
+    def __init__(self, tests):
+        self.bits = {x: 1 << i for i, x in enumerate(c.test_conditions)}
+        self.masks = {}
+        # (ID, mandatory, mask) of each test case, in catalog order
+        self.entries = []
+        for key, info in tests.items():
+            mask = 0
+            for condition in info.get('test_conditions', []):
+                if condition not in self.bits:
+                    self.bits[condition] = 1 << len(self.bits)
+                mask |= self.bits[condition]
+            self.masks[key] = mask
+            self.entries.append((info.get('id'), info.get('mandatory') is True, mask))
+        self.mandatory = [id_ for id_, mandatory, _ in self.entries if mandatory]
+        self._selections = {0: self.mandatory}
+
+    def mask(self, conditions):
+        """Return the mask of a list of conditions. Conditions of no test case are left out, they cannot change the
+        selection.
+
+        :param conditions: list of test conditions
+        :type conditions: list[int]
+
+        :rtype: int
+        """
+        mask = 0
+        for condition in conditions:
+            mask |= self.bits.get(condition, 0)
+        return mask
+
+    def conditions(self, mask):
+        """Return the conditions of a mask.
+
+        :param mask: mask from mask() or of a test case
+        :type mask: int
+
+        :rtype: list[int]
+        """
+        return sorted(x for x, bit in self.bits.items() if mask & bit)
+
+    def select(self, conditions):
+        """Return the IDs of the test cases required for a list of conditions. The list is shared, it must not be
+        modified.
+
+        :param conditions: list of test conditions
+        :type conditions: list[int]
+
+        :rtype: list[str]
+        """
+        mask = self.mask(conditions)
+        selection = self._selections.get(mask)
+        if selection is None:
+            selection = [id_ for id_, mandatory, tc_mask in self.entries
+                         if mandatory or (tc_mask and not tc_mask & ~mask)]
+            self._selections[mask] = selection
+        return selection
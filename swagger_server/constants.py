@@ -83,11 +83,17 @@ server_dir = os.path.dirname(os.path.abspath(__file__))
 root_dir = os.path.abspath(os.path.join(server_dir, os.pardir))
 cert_files_dir = os.path.join(root_dir, 'cert_files')
 log_dir = os.path.join(root_dir, 'logs')
+# Metric files of the processes (multiprocess mode of prometheus_client). The files are named by pid, so each container
+# needs a directory of its own, below metrics_export_dir, whose files the API serves.
+metrics_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR', os.path.join(log_dir, 'metrics'))
+metrics_export_dir = os.environ.get('METRICS_EXPORT_DIR', metrics_dir)
 template_dir = os.path.join(cert_files_dir, 'template')
+document_dir = os.path.join(cert_files_dir, 'documents')
 # Files
 database = os.path.join(cert_files_dir, 'database.json')
 cert_template = os.path.join(template_dir, 'certificate_template.html')
 cert_failed_template = os.path.join(template_dir, 'cert_failed_template.html')
+cert_stylesheet = os.path.join(template_dir, 'certificate.css')
 logo_ec = os.path.join(template_dir, 'ec_logo.png')
 logo_5gasp = os.path.join(template_dir, '5gasp_logo.png')
 log_file = os.path.join(log_dir, 'app_server.log')
@@ -104,3 +110,94 @@ status_names = {
     status_error: 'Error',
 }
 
+# Certificate creations, one hash per testing
+cert_key_prefix = 'cert:'
+cert_fence_key = 'cert:fence'  # counter of the fencing tokens
+cert_queue_timeout = 86400  # seconds a queued creation counts as alive until a worker takes its job
+cert_lease_timeout = 120  # seconds until the lease of a creation expires if it is not renewed
+cert_lease_renew_interval = 30  # seconds
+cert_status_max_wait = 10  # seconds a status request may wait for the end of a creation, it holds a server thread
+# Job queue
+job_queue = 'cert_jobs'
+job_poll_timeout = 5  # seconds, how long a worker blocks on the queue before checking again
+job_processing_prefix = 'cert_jobs:processing:'  # list of the jobs a worker process is running, by host:pid
+job_recover_key = 'cert_jobs:recover'
+job_recover_interval = 30  # seconds between checks for jobs of dead worker processes
+worker_processes = int(os.environ.get('WORKER_PROCESSES', '2'))  # render processes of a worker
+worker_threads = int(os.environ.get('WORKER_THREADS', '4'))  # jobs of a worker fetching data or waiting for a render
+render_max_in_flight = worker_processes * 2  # render tasks submitted at a time, the others wait
+render_max_tasks = int(os.environ.get('RENDER_MAX_TASKS', '50'))  # tasks after which a render process is replaced
+# seconds a render may take, including the wait for a free render process, before the render processes are killed
+render_timeout = int(os.environ.get('RENDER_TIMEOUT', '120'))
+# Fork the render processes from a server process which preloaded the render libraries (see preload.py), instead of
+# starting each one from scratch
+render_preload = os.environ.get('RENDER_PRELOAD', 'false').lower() in ('1', 'true', 'yes')
+# Where the worker renders the documents: 'pool' (own render pool), 'socket' (renderer service, see renderer.py) or
+# 'inline' (in the calling thread, for tests)
+renderer = os.environ.get('RENDERER', 'pool')
+renderer_socket = os.environ.get('RENDERER_SOCKET', '/tmp/cert_renderer.sock')  # Unix socket of the renderer service
+renderer_authkey = os.environ.get('RENDERER_AUTHKEY', '').encode() or None  # shared secret, required for 'socket'
+renderer_connect_timeout = 60  # seconds the worker waits for the renderer service at start
+renderer_reply_margin = 10  # seconds the worker waits for a render of the renderer service beyond render_timeout
+renderers_key = 'renderers'  # sorted set of warmed-up worker processes by their last heartbeat
+renderer_heartbeat_timeout = 60  # seconds after which a worker without heartbeat is not counted as ready
+
+
+# Test catalog cache (/tests/all)
+catalog_key = 'catalog'
+catalog_meta_key = 'catalog:meta'
+catalog_lock_key = 'catalog:lock'
+catalog_ttl = int(os.environ.get('CATALOG_TTL', '300'))  # seconds until the catalog is revalidated
+catalog_sync_interval = 5  # seconds between checks of a process' local copy against Redis
+catalog_lock_timeout = 120  # seconds, longer than a refresh with its retries (cicd_timeouts, cicd_retries)
+catalog_wait_interval = 0.5  # seconds between checks while waiting for the first catalog of another process
+
+# Test bed names (/testbeds/all)
+testbed_key = 'testbeds'
+testbed_meta_key = 'testbeds:fetched_at'
+testbed_lock_key = 'testbeds:lock'
+testbed_refresh_interval = int(os.environ.get('TESTBED_REFRESH_INTERVAL', '600'))  # seconds
+testbed_check_interval = min(60, testbed_refresh_interval)  # seconds between checks of the age of the map
+testbed_lock_timeout = 10  # seconds
+
+# CI/CD Manager client
+cicd_pool_size = 10  # keep-alive connections per process
+cicd_timeouts = {  # seconds, (connect, read) per endpoint
+    'default': (3.05, 10),
+    '/gui/tests-performed': (3.05, 30),
+    '/tests/all': (3.05, 30),
+    '/testbeds/all': (3.05, 3),
+}
+cicd_retries = 2  # retries after the first try, only for connection errors, timeouts and 5xx responses
+cicd_retry_backoff = 0.5  # seconds, doubled on every retry
+cicd_breaker_threshold = 5  # failed calls in a row until the circuit breaker opens
+cicd_breaker_reset = 30  # seconds the circuit breaker stays open
+cicd_circuit_key = 'cicd:circuit_open'
+# Parse large responses (/tests/all, /gui/tests-performed) while reading them, if ijson is installed
+cicd_stream_json = os.environ.get('CICD_STREAM_JSON', 'true').lower() in ('1', 'true', 'yes')
+# Fields of the performed tests which are kept for a certificate
+result_fields = ['performed_test', 'original_test_name', 'success', 'start_time', 'is_developer_defined']
+
+# Radar charts
+chart_backend = os.environ.get('CHART_BACKEND', 'png')  # 'png' (matplotlib) or 'svg' (inline, no matplotlib)
+chart_cache_size = 256  # rendered charts kept by each worker process
+
+# Logging (see log.py)
+log_backup_count = 14  # rotated log files kept, one per day
+log_payload_max = int(os.environ.get('LOG_PAYLOAD_MAX', '2000'))  # characters of a logged payload, longer ones are cut
+
+# Tracing of the requests (see tracing.py): 'none' or 'jsonl' (spans appended to trace_file as JSON lines)
+trace_exporter = os.environ.get('TRACE_EXPORTER', 'none')
+trace_file = os.environ.get('TRACE_FILE', os.path.join(log_dir, 'traces.jsonl'))
+
+# Let the web server send the certificate files (X-Sendfile header), e.g. Apache with mod_xsendfile
+use_x_sendfile = os.environ.get('USE_X_SENDFILE', 'false').lower() in ('1', 'true', 'yes')
+
+# Rendered documents, stored by the digest of their render inputs
+document_key = 'documents'  # hash of digest -> document info
+document_info_fields = ['test_id', 'access_token', 'netapp_id', 'testbed_id', 'app_name', 'app_version', 'app_author',
+                        'service_order', 'test_conditions']  # fields of the testing which go into a document
+document_sweep_key = 'documents:sweep'
+document_sweep_interval = int(os.environ.get('DOCUMENT_SWEEP_INTERVAL', '3600'))  # seconds between evictions
+# seconds a document is kept after it was last written or used without a certificate creation referring to it
+document_grace_period = int(os.environ.get('DOCUMENT_GRACE_PERIOD', '86400'))
@@ -1,14 +1,27 @@
 import os
+import time
+
 import connexion
 import six
 from flask import render_template, request, send_file, send_from_directory, Response
 
-from .__init__ import logger, mRedis
+from .__init__ import mRedis
+from swagger_server import catalog
 from swagger_server import cert_entity as cert
+from swagger_server import cicd_client
 from swagger_server import constants as c
+from swagger_server import jobs
+from swagger_server import metrics
+from swagger_server import store
+from swagger_server import tracing
 from swagger_server import util
+from swagger_server.models.catalog_info import CatalogInfo  # noqa: E501
+from swagger_server.models.cert_batch_item import CertBatchItem  # noqa: E501
 from swagger_server.models.cert_created import CertCreated  # noqa: E501
+from swagger_server.models.cert_job import CertJob  # noqa: E501
+from swagger_server.models.cert_status import CertStatus  # noqa: E501
 from swagger_server.models.create_cert import CreateCert  # noqa: E501
+from swagger_server.models.readiness import Readiness  # noqa: E501
 from swagger_server.models.server_info import ServerInfo  # noqa: E501
 from swagger_server.models.test_case_list import TestCaseList  # noqa: E501
 
@@ -16,6 +29,32 @@ from swagger_server.models.test_case_list import TestCaseList  # noqa: E501
 API_CERTIFICATE_ENDPOINT = os.environ.get('API_CERTIFICATE_ENDPOINT')
 
 
+def _certificate_url(test_id, access_token, path=''):
+    # API_CERTIFICATE_ENDPOINT overrides the base url
+    base_url = API_CERTIFICATE_ENDPOINT or f"{request.url_root}certificate"
+    return f"{base_url}{path}?test_id={test_id}&access_token={access_token}"
+
+
+def _existing_creation(body, status):
+    # Response if a certificate creation with the given status does not need to be started
+    if status == c.status_finished:
+        url = _certificate_url(body.test_id, body.access_token)
+        return {"message": "The certificate for this ID has already been created.", "certificate": url}, 208
+    elif status == c.status_progress:
+        return "This certificate is currently being created, please wait.", 208
+    return None
+
+
+def _traced(name, handler, *args, **attributes):
+    # Handle the request as the root span of a trace, with the status code of the response
+    with tracing.trace(name, **attributes) as span:
+        response = handler(*args)
+        if span is not None:
+            span.attributes['status_code'] = (response[1] if isinstance(response, tuple)
+                                              else getattr(response, 'status_code', 200))
+        return response
+
+
 def create_cert(body):  # noqa: E501
     """Create a certificate for a testing (identified by the test_id)
 
@@ -24,73 +63,63 @@ def create_cert(body):  # noqa: E501
     :param body: Create a certificate
     :type body: dict | bytes
 
-    :rtype: CertCreated
+    :rtype: CertJob
     """
     if connexion.request.is_json:
         body = CreateCert.from_dict(connexion.request.get_json())  # noqa: E501
-        if mRedis.exists(body.test_id):
-            if int(mRedis.get(f"{body.test_id}_status").decode()) == c.status_finished:
-                # API_CERTIFICATE_ENDPOINT overrides the base url
-                url = (f"{API_CERTIFICATE_ENDPOINT or request.base_url}?test_id={body.test_id}"
-                       f"&access_token={body.access_token}")
-                return {"message": "The certificate for this ID has already been created.", "certificate": url}, 208
-            elif int(mRedis.get(f"{body.test_id}_status").decode()) == c.status_progress:
-                return "This certificate is currently being created, please wait.", 208
-
-        msg_prefix = f"test_id '{body.test_id}'"
-        logger.info(f"{msg_prefix}: Start creating certificate")
-
-        # Redis
-        mRedis.set(body.test_id, "")
-        mRedis.set(f"{body.test_id}_access_token", body.access_token)
-        mRedis.set(f"{body.test_id}_status", c.status_progress)
-
-        # Get all required data
-        base_info, err_msg_1 = cert.get_test_info('base', body.test_id, body.access_token)
-        results, err_msg_2 = cert.get_test_info('results', body.test_id, body.access_token)
-        test_cases, err_msg_3 = cert.get_test_info('test_cases', body.test_id, body.access_token)
-        if all([base_info, results, test_cases]):
-            logger.debug(f"{msg_prefix}: All required info retrieved")
-            conditions = cert.get_test_conditions(results, test_cases, base_info['testbed_id'])
-            base_info.update({
-                'access_token': body.access_token,
-                'app_name': body.app_name,
-                'app_version': body.app_version,
-                'app_author': body.app_author,
-                'service_order': body.service_order,
-                'test_conditions': conditions,
-            })
-            # Create certificate
-            output = cert.create_certificate(base_info, results, test_cases)
-            if isinstance(output, str):
-                # Redis
-                mRedis.set(f"{body.test_id}_status", c.status_error)
-                logger.error(f"{msg_prefix}: Failed to create certificate, {output}")
-                return output, 404
-            elif output:
-                is_cert, radar_chart, cert_file = output
-                # Redis
-                mRedis.set(f"{body.test_id}_access_token", body.access_token)
-                mRedis.set(f"{body.test_id}_status", c.status_finished if is_cert else c.status_finished_no_cert)
-                mRedis.set(f"{body.test_id}_cert", f'{cert_file}.pdf')
-                mRedis.set(f"{body.test_id}_chart", radar_chart)
-                
-                # API_CERTIFICATE_ENDPOINT overrides the base url
-                url = (f"{API_CERTIFICATE_ENDPOINT or request.base_url}?test_id={body.test_id}"
-                       f"&access_token={body.access_token}")
-                logger.info(f"{msg_prefix}: Finished creating certificate")
-                return {'certificate': url}, 200
-            else:
-                mRedis.set(f"{body.test_id}_status", c.status_error)
-                logger.error(f"{msg_prefix}: Failed to create certificate, unexpected error occurred")
-                return "Unexpected error occurred while creating certificate.", 500
-        else:
-            all_err_msg = ' '.join([err_msg_1, err_msg_2, err_msg_3])
-            mRedis.set(f"{body.test_id}_status", c.status_error)
-            err_msg = (f"Could not fetch all required data from the CI/CD Manager to create the certificate: "
-                       f"{all_err_msg}")
-            logger.error(f"{msg_prefix}: {err_msg}")
-            return err_msg, 404
+        return _traced('create_cert', _create_cert, body, test_id=body.test_id)
+
+
+def _create_cert(body):
+    status, = store.get(body.test_id, 'status')
+    status = int(status or 0)
+    if status == c.status_progress and not store.lease_alive(body.test_id):
+        # The worker of this creation died, start it again
+        status = 0
+    response = _existing_creation(body, status)
+    if response:
+        return response
+    if not cicd_client.get_client().available():
+        return "The CI/CD Manager is currently unavailable, please try again later.", 503
+
+    # Another request may have started the creation meanwhile
+    response = _existing_creation(body, jobs.enqueue(body))
+    if response:
+        return response
+    url = _certificate_url(body.test_id, body.access_token, '/status')
+    return {'job': url}, 202, {'Location': url}
+
+
+def create_cert_batch(body):  # noqa: E501
+    """Create the certificates for several testings at once
+
+     # noqa: E501
+
+    :param body: Create certificates
+    :type body: list | bytes
+
+    :rtype: List[CertBatchItem]
+    """
+    if connexion.request.is_json:
+        body = [CreateCert.from_dict(d) for d in connexion.request.get_json()]  # noqa: E501
+        return _traced('create_cert_batch', _create_cert_batch, body, test_ids=[x.test_id for x in body])
+
+
+def _create_cert_batch(body):
+    if not cicd_client.get_client().available():
+        return "The CI/CD Manager is currently unavailable, please try again later.", 503
+
+    output = []
+    for item, status in zip(body, jobs.enqueue_batch(body)):
+        item_output = {
+            'test_id': item.test_id,
+            'status': c.status_names[c.status_finished if status == c.status_finished else c.status_progress],
+            'job': _certificate_url(item.test_id, item.access_token, '/status'),
+        }
+        if status == c.status_finished:
+            item_output['certificate'] = _certificate_url(item.test_id, item.access_token)
+        output.append(item_output)
+    return output, 202
 
 
 def get_cert(test_id, access_token):  # noqa: E501
@@ -105,18 +134,88 @@ def get_cert(test_id, access_token):  # noqa: E501
 
     :rtype: str
     """
-    if (mRedis.exists(test_id) and int(mRedis.get(f"{test_id}_status").decode()) in 
-            [c.status_finished, c.status_finished_no_cert]):
-        if access_token == mRedis.get(f"{test_id}_access_token").decode():
-            pdf_file = mRedis.get(f"{test_id}_cert").decode() 
+    return _traced('get_cert', _get_cert, test_id, access_token, test_id=test_id)
+
+
+def _get_cert(test_id, access_token):
+    status, token, pdf_file, pdf_name = store.get(test_id, 'status', 'access_token', 'cert', 'cert_name')
+    if status and int(status) in [c.status_finished, c.status_finished_no_cert]:
+        if access_token == token:
             file_path = os.path.join(c.cert_files_dir, pdf_file)
-            return send_file(file_path, as_attachment=True), 200
+            # Documents are stored by their digest, they are downloaded under their original name.
+            # The response answers conditional (ETag, Last-Modified) and Range requests itself, with 304 or 206, so
+            # the status code must not be overridden. With USE_X_SENDFILE, the web server sends the file.
+            with tracing.span('send_file'):
+                return send_file(file_path, as_attachment=True, download_name=pdf_name or os.path.basename(pdf_file),
+                                 conditional=True, etag=True)
         else:
             return "The access token is not correct for this ID.", 403
     else:
         return "A certificate for this ID does not exist.", 404
 
 
+def get_cert_status(test_id, access_token, wait=None):  # noqa: E501
+    """Get the status of the certificate creation for a testing (identified by the test_id)
+
+     # noqa: E501
+
+    :param test_id:
+    :type test_id: int
+    :param access_token:
+    :type access_token: str
+    :param wait: Seconds to wait for the end of a creation in progress before responding
+    :type wait: int
+
+    :rtype: CertStatus
+    """
+    status, token, err_msg = store.get(test_id, 'status', 'access_token', 'error')
+    if not status:
+        return "There is no certificate creation for this ID.", 404
+    if access_token != token:
+        return "The access token is not correct for this ID.", 403
+    status = int(status)
+    if status == c.status_progress and wait:
+        status = store.wait(test_id, min(wait, c.cert_status_max_wait))
+        if status == c.status_error:
+            err_msg, = store.get(test_id, 'error')
+    if status == c.status_progress and not store.lease_alive(test_id):
+        # The worker of this creation died, it can be started again
+        status = c.status_error
+        err_msg = "The certificate creation was interrupted, please create the certificate again."
+    output = {'status': c.status_names[status]}
+    if status in [c.status_finished, c.status_finished_no_cert]:
+        output['certificate'] = _certificate_url(test_id, access_token)
+    elif status == c.status_error and err_msg:
+        output['message'] = err_msg
+    return output, 200
+
+
+def get_metrics():  # noqa: E501
+    """Get the metrics of all processes in the Prometheus text format
+
+     # noqa: E501
+
+
+    :rtype: str
+    """
+    output, content_type = metrics.export()
+    if output is None:
+        return "Metrics are not available, prometheus_client is not installed.", 404
+    return Response(output, content_type=content_type)
+
+
+def get_readiness():  # noqa: E501
+    """Get the readiness of the server, ready once at least one worker has warmed up its render engine
+
+     # noqa: E501
+
+
+    :rtype: Readiness
+    """
+    renderers = mRedis.zcount(c.renderers_key, time.time() - c.renderer_heartbeat_timeout, '+inf')
+    return {'ready': bool(renderers), 'renderers': renderers}, 200 if renderers else 503
+
+
 def get_server_info():  # noqa: E501
     """Get server info
 
@@ -157,3 +256,20 @@ def get_test_cases(test_bed, test_conditions=None):  # noqa: E501
             return err_msg, 404
         else:
             return {'test_cases': output}, 200
+
+
+def refresh_catalog():  # noqa: E501
+    """Force a refresh of the cached test catalog from the CI/CD Manager
+
+     # noqa: E501
+
+
+    :rtype: CatalogInfo
+    """
+    version, err_msg = catalog.refresh(force=True)
+    if err_msg:
+        return err_msg, 404
+    return {
+        'version': version,
+        'test_beds': sorted(x.decode() for x in mRedis.hkeys(c.catalog_key)),
+    }, 200
@@ -0,0 +1,244 @@
+"""
+Certificate job queue
+
+The API only enqueues certificate jobs, the worker threads (see worker.py) take them from the Redis list, do the
+fetching from the CI/CD Manager and hand the rendering to the render pool.
+A worker process moves the jobs it takes to a processing list of its own, until they are done. The processing lists of
+processes without a recent heartbeat are put back on the queue by the other workers, see recover().
+"""
+import json
+import os
+import socket
+import time
+
+from swagger_server import cert_entity as cert
+from swagger_server import constants as c
+from swagger_server import log
+from swagger_server import metrics
+from swagger_server import store
+from swagger_server import tracing
+from swagger_server.controllers.__init__ import logger, mRedis
+
+
+def enqueue(body):
+    """Start the certificate creation of a testing and put the job on the queue, unless a creation is in progress or
+    the certificate already exists.
+
+    :param body: request body of the certificate creation
+    :type body: CreateCert
+
+    :return: 0 if the job was queued, otherwise the status of the existing creation
+    :rtype: int
+    """
+    status, fence = store.start(body.test_id, body.access_token)
+    if status:
+        return status
+    job = body.to_dict()
+    job['fence'] = fence
+    # The worker continues the trace of the request
+    job['traceparent'] = tracing.inject()
+    mRedis.lpush(c.job_queue, json.dumps(job))
+    logger.info("test_id '%s': Certificate job queued", body.test_id)
+    return 0
+
+
+def enqueue_batch(bodies):
+    """Start the certificate creations of several testings and put them on the queue as one batch job, except those
+    with a creation in progress or an existing certificate.
+
+    :param bodies: request bodies of the certificate creations
+    :type bodies: list[CreateCert]
+
+    :return: for each testing, 0 if its creation was queued, otherwise the status of the existing creation
+    :rtype: list[int]
+    """
+    started = store.start_many([(x.test_id, x.access_token) for x in bodies])
+    batch = []
+    for body, (status, fence) in zip(bodies, started):
+        if not status:
+            job = body.to_dict()
+            job['fence'] = fence
+            batch.append(job)
+    if batch:
+        mRedis.lpush(c.job_queue, json.dumps({'batch': batch, 'traceparent': tracing.inject()}))
+        logger.info("Batch of %d certificate jobs queued: %s", len(batch), [x['test_id'] for x in batch])
+    return [status for status, _ in started]
+
+
+def run_batch(batch):
+    """Fetch the data of a batch of certificate jobs from the CI/CD Manager at once, then queue the jobs with their
+    data, so they are rendered by all worker processes in parallel. Their creations stay queued meanwhile, see
+    store.requeue().
+
+    :param batch: certificate jobs, see run_job()
+    :type batch: list[dict]
+    """
+    logger.info("Fetching data for batch of %d certificate jobs", len(batch))
+    with metrics.stage('fetch_batch'):
+        fetched = cert.fetch_batch_test_info([(x['test_id'], x['access_token']) for x in batch])
+    # The creations stay queued until a worker takes their jobs, unless they were started again or ended meanwhile
+    queued = store.requeue(_creations({'batch': batch}))
+    pipe = mRedis.pipeline(transaction=False)
+    for job, prefetched, is_queued in zip(batch, fetched, queued):
+        if not is_queued:
+            logger.info("test_id '%s': The certificate creation was started again or has ended, skipping job",
+                        job['test_id'])
+            continue
+        job['prefetched'] = prefetched
+        job['traceparent'] = tracing.inject()
+        pipe.lpush(c.job_queue, json.dumps(job))
+    pipe.execute()
+
+
+def run_job(job):
+    """Create the certificate for a queued job and save the outcome in Redis. The job is only run while it holds the
+    lease of its certificate creation, see store.Lease.
+
+    :param job: request body of the certificate creation, the fencing token of the creation, the trace context of the
+                request (traceparent) and optionally the data already fetched from the CI/CD Manager (prefetched, see
+                cert_entity.fetch_test_info())
+    :type job: dict
+    """
+    with store.Lease(job['test_id'], job.get('fence', 0)) as held:
+        if not held:
+            logger.info("test_id '%s': The certificate creation was started again, has ended or is run by another "
+                        "worker, skipping job", job['test_id'])
+            return
+        with metrics.task('job'), metrics.stage('job', test_id=job['test_id']):
+            _create(job)
+
+
+def _create(job):
+    test_id = job['test_id']
+    fence = job['fence']
+    access_token = job['access_token']
+    msg_prefix = f"test_id '{test_id}'"
+    logger.info("%s: Start creating certificate", msg_prefix)
+
+    # Get all required data
+    with metrics.stage('fetch'):
+        fetched = cert.fetch_test_info(test_id, access_token, job.get('prefetched'))
+    (base_info, err_msg_1), (results, err_msg_2), (test_cases, err_msg_3) = fetched
+    if not all([base_info, results, test_cases]):
+        all_err_msg = ' '.join([err_msg_1, err_msg_2, err_msg_3])
+        err_msg = (f"Could not fetch all required data from the CI/CD Manager to create the certificate: "
+                   f"{all_err_msg}")
+        store.fail(test_id, fence, err_msg)
+        logger.error("%s: %s", msg_prefix, log.Payload(err_msg))
+        return
+
+    logger.debug("%s: All required info retrieved", msg_prefix)
+    conditions = cert.get_test_conditions(results, test_cases, base_info['testbed_id'])
+    base_info.update({
+        'access_token': access_token,
+        'app_name': job['app_name'],
+        'app_version': job['app_version'],
+        'app_author': job['app_author'],
+        'service_order': job['service_order'],
+        'test_conditions': conditions,
+    })
+    # Create certificate
+    output = cert.create_certificate(base_info, results, test_cases)
+    if isinstance(output, str):
+        store.fail(test_id, fence, output)
+        logger.error("%s: Failed to create certificate, %s", msg_prefix, log.Payload(output))
+    elif output:
+        is_cert, radar_chart, cert_file, cert_name = output
+        if store.finish(test_id, fence, is_cert, f'{cert_file}.pdf', f'{cert_name}.pdf', radar_chart):
+            logger.info("%s: Finished creating certificate", msg_prefix)
+        else:
+            logger.warning("%s: Finished creating certificate, but the creation was started again meanwhile", msg_prefix)
+    else:
+        store.fail(test_id, fence, "Unexpected error occurred while creating certificate.")
+        logger.error("%s: Failed to create certificate, unexpected error occurred", msg_prefix)
+
+
+def _worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _processing_key(worker_id):
+    return f"{c.job_processing_prefix}{worker_id}"
+
+
+def heartbeat():
+    """Announce this process as alive and ready to render, see get_readiness() in the controller and recover()."""
+    now = time.time()
+    pipe = mRedis.pipeline()
+    pipe.zadd(c.renderers_key, {_worker_id(): now})
+    pipe.zremrangebyscore(c.renderers_key, 0, now - c.renderer_heartbeat_timeout)
+    pipe.execute()
+
+
+def _creations(job):
+    return [(x['test_id'], x.get('fence', 0)) for x in job.get('batch') or [job]]
+
+
+def _put_back(processing, item):
+    store.requeue(_creations(json.loads(item)))
+    pipe = mRedis.pipeline()
+    pipe.lrem(processing, 1, item)
+    # The job is taken by the next worker, before the newer jobs on the queue
+    pipe.rpush(c.job_queue, item)
+    pipe.execute()
+
+
+def recover(at_start=False):
+    """Put the jobs of worker processes without a recent heartbeat back on the queue, e.g. after a worker container was
+    killed. Their creations are marked as queued again, see store.requeue().
+
+    :param at_start: also put back the jobs of this process, i.e. of an earlier process with the same host and pid, when
+                     the worker starts
+    :type at_start: bool
+
+    :return: number of jobs put back
+    :rtype: int
+    """
+    processing = _processing_key(_worker_id())
+    recovered = 0
+    if at_start:
+        # Oldest job first
+        for item in reversed(mRedis.lrange(processing, 0, -1)):
+            _put_back(processing, item)
+            recovered += 1
+    alive = {x.decode() for x in
+             mRedis.zrangebyscore(c.renderers_key, time.time() - c.renderer_heartbeat_timeout, '+inf')}
+    for key in mRedis.scan_iter(match=f"{c.job_processing_prefix}*", count=1000):
+        worker_id = key.decode()[len(c.job_processing_prefix):]
+        if worker_id in alive or worker_id == _worker_id():
+            continue
+        while True:
+            # Moved to the processing list of this process first, so the job is not lost if this process dies too
+            item = mRedis.lmove(key, processing, 'RIGHT', 'LEFT')
+            if item is None:
+                break
+            _put_back(processing, item)
+            recovered += 1
+    if recovered:
+        logger.warning("Put %d jobs of dead worker processes back on the queue", recovered)
+    return recovered
+
+
+def work():
+    """Take jobs from the queue and run them, forever. The render pool of the process must be warmed up before."""
+    logger.info("Worker thread waiting for jobs on '%s'", c.job_queue)
+    processing = _processing_key(_worker_id())
+    while True:
+        item = mRedis.blmove(c.job_queue, processing, c.job_poll_timeout, 'RIGHT', 'LEFT')
+        if item is None:
+            continue
+        job = json.loads(item)
+        batch = job.get('batch')
+        try:
+            with tracing.attach(job.get('traceparent')):
+                if batch:
+                    run_batch(batch)
+                else:
+                    run_job(job)
+        except Exception as e:
+            for failed in batch or [job]:
+                store.fail(failed['test_id'], failed.get('fence', 0),
+                           "Unexpected error occurred while creating certificate.")
+                logger.exception("test_id '%s': Failed to create certificate: %s", failed['test_id'], e)
+        finally:
+            mRedis.lrem(processing, 1, item)
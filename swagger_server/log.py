@@ -0,0 +1,123 @@
+"""
+Logging of the certificate entity
+
+All processes (API, worker, renderer service, render processes) log to constants.log_file. The threads which log only
+hand their records to a queue (QueueHandler), a listener thread of the process writes them to the file, so a request
+does not wait for the disk. Messages are formatted with %-style arguments, only if the record is logged at all, and
+large payloads, e.g. responses of the CI/CD Manager, are wrapped in Payload to log only their beginning and digest.
+
+The file is rotated at midnight by the first process which writes to it afterwards. The processes agree on the rotation
+with a lock file, see LockedTimedRotatingFileHandler.
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import logging.handlers
+import multiprocessing.util
+import os
+import queue
+import threading
+import time
+
+from swagger_server import constants as c
+
+
+class Payload:
+    """Payload of a log message, formatted only if the message is logged. Payloads longer than constants.log_payload_max
+    characters are cut, followed by their length and digest to tell them apart.
+
+    :param value: the payload, e.g. JSON data
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        text = self.value if isinstance(self.value, str) else json.dumps(self.value, default=str)
+        if len(text) <= c.log_payload_max:
+            return text
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        return f"{text[:c.log_payload_max]}... ({len(text)} characters, sha256 {digest})"
+
+
+class LockedTimedRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """TimedRotatingFileHandler for a file shared by several processes. Each record is written, and the file rotated,
+    while holding an exclusive lock on a lock file next to it. A process which finds that another process rotated the
+    file already writes to the new file instead of rotating it again, which would delete the rotated file.
+
+    :param filename: path of the log file
+    :type filename: str
+    """
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, delay=True, **kwargs)
+        self._lock_file = None
+        self._lock_pid = None
+
+    def emit(self, record):
+        # The lock is opened by each process: a lock inherited from the parent process would be shared with it
+        try:
+            if self._lock_pid != os.getpid():
+                self._lock_file = open(f"{self.baseFilename}.lock", 'a')
+                self._lock_pid = os.getpid()
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        except OSError:
+            self.handleError(record)
+            return
+        try:
+            super().emit(record)
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def shouldRollover(self, record):
+        if not super().shouldRollover(record):
+            return False
+        try:
+            rotated = os.stat(self.baseFilename).st_mtime >= self.rolloverAt
+        except FileNotFoundError:
+            rotated = True
+        if not rotated:
+            return True
+        # Another process rotated the file since it was opened, continue with the new file
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self.rolloverAt = self.computeRollover(int(time.time()))
+        return False
+
+    def close(self):
+        super().close()
+        if self._lock_file and self._lock_pid == os.getpid():
+            self._lock_file.close()
+        self._lock_file = None
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """Hand the records to a listener thread, which passes them on to the handlers. Each process starts its listener
+    with its first record, and stops it when it exits, after the queued records are handled.
+
+    :param handlers: handlers of the records, e.g. a LockedTimedRotatingFileHandler
+    :type handlers: logging.Handler
+    """
+    def __init__(self, *handlers):
+        super().__init__(None)
+        self.handlers = handlers
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+            listener.start()
+            # Also run when a render process exits, which skips the atexit functions
+            multiprocessing.util.Finalize(None, listener.stop, exitpriority=0)
+            self._pid = os.getpid()
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        self.queue.put_nowait(record)
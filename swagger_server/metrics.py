@@ -0,0 +1,193 @@
+"""
+Metrics of the certificate creations
+
+Prometheus metrics, served by the API on /metrics:
+- cert_stage_seconds: duration of each stage of a certificate (fetch, base_dictionary, axis_scores, chart, template,
+  pdf, render, job)
+- cert_creations_total: certificate creations by status (constants.status_names), counted when they are started and
+  when they end
+- cert_in_progress: jobs and renders in progress
+- cert_cache_lookups_total: hits and misses of the caches (document, chart, catalog), for their hit ratio
+
+All processes (API, worker, renderer service) write their metrics to files in constants.metrics_dir, the multiprocess
+mode of prometheus_client, and /metrics aggregates the files below constants.metrics_export_dir, whichever API process
+answers. The directory of a container is emptied when it starts (docker-entrypoint.sh). The processes of the render
+pool are replaced regularly and would leave files behind, so they do not record metrics themselves: their observations
+are collected by a Recorder and recorded by the process which submitted the task, see run_recorded().
+Without prometheus_client, nothing is recorded.
+"""
+import atexit
+import contextlib
+import contextvars
+import glob
+import os
+import time
+
+from swagger_server import constants as c
+from swagger_server import tracing
+
+# The multiprocess mode must be set up before prometheus_client is imported
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', c.metrics_dir)
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+
+class _Unavailable:
+    """Stand-in for the metrics without prometheus_client."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, amount):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+
+# All metrics have labels: the files of a process are only created once it records a value
+if prometheus_client:
+    stage_seconds = prometheus_client.Histogram(
+        'cert_stage_seconds', 'Duration of the stages of a certificate creation', ['stage'],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+    creations = prometheus_client.Counter(
+        'cert_creations_total', 'Certificate creations by status', ['status'])
+    in_progress = prometheus_client.Gauge(
+        'cert_in_progress', 'Certificate jobs and renders in progress', ['task'], multiprocess_mode='livesum')
+    cache_lookups = prometheus_client.Counter(
+        'cert_cache_lookups_total', 'Cache lookups by cache and result (hit, miss)', ['cache', 'result'])
+else:
+    stage_seconds = creations = in_progress = cache_lookups = _Unavailable()
+
+# Recorder of the current task, if its observations are recorded by another process
+_recorder = contextvars.ContextVar('recorder', default=None)
+
+
+class Recorder:
+    """Observations of a task, to be recorded by another process."""
+
+    def __init__(self):
+        self.stages = []
+        self.cache_lookups = []
+
+    def record(self):
+        """Record the observations in the metrics of this process."""
+        for stage, seconds in self.stages:
+            stage_seconds.labels(stage).observe(seconds)
+        for cache, hit in self.cache_lookups:
+            cache_lookups.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def run_recorded(fn, *args):
+    """Run a function and collect its observations instead of recording them, e.g. in a render process.
+
+    :param fn: module-level function
+    :type fn: callable
+    :param args: arguments of the function
+
+    :return: result of the function, observations
+    :rtype: object, Recorder
+    """
+    recorder = Recorder()
+    token = _recorder.set(recorder)
+    try:
+        return fn(*args), recorder
+    finally:
+        _recorder.reset(token)
+
+
+@contextlib.contextmanager
+def stage(name, **attributes):
+    """Measure the duration of a stage of a certificate creation, also recorded as a span of the current trace.
+
+    :param name: name of the stage
+    :type name: str
+    :param attributes: details of the span, e.g. test_id
+    """
+    start = time.perf_counter()
+    try:
+        with tracing.span(name, **attributes):
+            yield
+    finally:
+        seconds = time.perf_counter() - start
+        recorder = _recorder.get()
+        if recorder is not None:
+            recorder.stages.append((name, seconds))
+        else:
+            stage_seconds.labels(name).observe(seconds)
+
+
+def cache(name, hit):
+    """Count a lookup in a cache.
+
+    :param name: name of the cache
+    :type name: str
+    :param hit: True if the value was found in the cache
+    :type hit: bool
+    """
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.cache_lookups.append((name, hit))
+    else:
+        cache_lookups.labels(name, 'hit' if hit else 'miss').inc()
+
+
+@contextlib.contextmanager
+def task(name):
+    """Count a task as in progress while it runs.
+
+    :param name: kind of task, e.g. job or render
+    :type name: str
+    """
+    gauge = in_progress.labels(name)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def creation(status):
+    """Count a certificate creation which was started or ended with a status.
+
+    :param status: status of the creation, see constants.status_names
+    :type status: int
+    """
+    creations.labels(c.status_names[status]).inc()
+
+
+def mark_process_dead():
+    """Drop the in-progress gauges of this process from the aggregation, when it exits."""
+    if prometheus_client:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+atexit.register(mark_process_dead)
+
+
+class _ExportCollector:
+    # Metric files of all containers, in the subdirectories of constants.metrics_export_dir
+
+    def collect(self):
+        files = glob.glob(os.path.join(c.metrics_export_dir, '**', '*.db'), recursive=True)
+        return multiprocess.MultiProcessCollector.merge(files, accumulate=True)
+
+
+def export():
+    """Return the metrics of all processes in the Prometheus text format.
+
+    :return: metrics (None without prometheus_client), content type
+    :rtype: bytes, str
+    """
+    if not prometheus_client:
+        return None, 'text/plain'
+    registry = prometheus_client.CollectorRegistry()
+    registry.register(_ExportCollector())
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
@@ -3,7 +3,12 @@
 # flake8: noqa
 from __future__ import absolute_import
 # import models into model package
+from swagger_server.models.catalog_info import CatalogInfo
+from swagger_server.models.cert_batch_item import CertBatchItem
 from swagger_server.models.cert_created import CertCreated
+from swagger_server.models.cert_job import CertJob
+from swagger_server.models.cert_status import CertStatus
 from swagger_server.models.create_cert import CreateCert
+from swagger_server.models.readiness import Readiness
 from swagger_server.models.server_info import ServerInfo
 from swagger_server.models.test_case_list import TestCaseList
@@ -0,0 +1,92 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server import util
+
+
+class CatalogInfo(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    def __init__(self, version: int=None, test_beds: List[str]=None):  # noqa: E501
+        """CatalogInfo - a model defined in Swagger
+
+        :param version: The version of this CatalogInfo.  # noqa: E501
+        :type version: int
+        :param test_beds: The test_beds of this CatalogInfo.  # noqa: E501
+        :type test_beds: List[str]
+        """
+        self.swagger_types = {
+            'version': int,
+            'test_beds': List[str]
+        }
+
+        self.attribute_map = {
+            'version': 'version',
+            'test_beds': 'test_beds'
+        }
+        self._version = version
+        self._test_beds = test_beds
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'CatalogInfo':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The CatalogInfo of this CatalogInfo.  # noqa: E501
+        :rtype: CatalogInfo
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def version(self) -> int:
+        """Gets the version of this CatalogInfo.
+
+        Version of the test catalog, changes whenever its content changes  # noqa: E501
+
+        :return: The version of this CatalogInfo.
+        :rtype: int
+        """
+        return self._version
+
+    @version.setter
+    def version(self, version: int):
+        """Sets the version of this CatalogInfo.
+
+        Version of the test catalog, changes whenever its content changes  # noqa: E501
+
+        :param version: The version of this CatalogInfo.
+        :type version: int
+        """
+
+        self._version = version
+
+    @property
+    def test_beds(self) -> List[str]:
+        """Gets the test_beds of this CatalogInfo.
+
+        Test bed IDs in the test catalog  # noqa: E501
+
+        :return: The test_beds of this CatalogInfo.
+        :rtype: List[str]
+        """
+        return self._test_beds
+
+    @test_beds.setter
+    def test_beds(self, test_beds: List[str]):
+        """Sets the test_beds of this CatalogInfo.
+
+        Test bed IDs in the test catalog  # noqa: E501
+
+        :param test_beds: The test_beds of this CatalogInfo.
+        :type test_beds: List[str]
+        """
+
+        self._test_beds = test_beds
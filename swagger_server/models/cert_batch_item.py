@@ -0,0 +1,154 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server import util
+
+
+class CertBatchItem(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    def __init__(self, test_id: int=None, status: str=None, job: str=None, certificate: str=None):  # noqa: E501
+        """CertBatchItem - a model defined in Swagger
+
+        :param test_id: The test_id of this CertBatchItem.  # noqa: E501
+        :type test_id: int
+        :param status: The status of this CertBatchItem.  # noqa: E501
+        :type status: str
+        :param job: The job of this CertBatchItem.  # noqa: E501
+        :type job: str
+        :param certificate: The certificate of this CertBatchItem.  # noqa: E501
+        :type certificate: str
+        """
+        self.swagger_types = {
+            'test_id': int,
+            'status': str,
+            'job': str,
+            'certificate': str
+        }
+
+        self.attribute_map = {
+            'test_id': 'test_id',
+            'status': 'status',
+            'job': 'job',
+            'certificate': 'certificate'
+        }
+        self._test_id = test_id
+        self._status = status
+        self._job = job
+        self._certificate = certificate
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'CertBatchItem':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The CertBatchItem of this CertBatchItem.  # noqa: E501
+        :rtype: CertBatchItem
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def test_id(self) -> int:
+        """Gets the test_id of this CertBatchItem.
+
+        ID of the testing  # noqa: E501
+
+        :return: The test_id of this CertBatchItem.
+        :rtype: int
+        """
+        return self._test_id
+
+    @test_id.setter
+    def test_id(self, test_id: int):
+        """Sets the test_id of this CertBatchItem.
+
+        ID of the testing  # noqa: E501
+
+        :param test_id: The test_id of this CertBatchItem.
+        :type test_id: int
+        """
+
+        self._test_id = test_id
+
+    @property
+    def status(self) -> str:
+        """Gets the status of this CertBatchItem.
+
+        State of the certificate creation  # noqa: E501
+
+        :return: The status of this CertBatchItem.
+        :rtype: str
+        """
+        return self._status
+
+    @status.setter
+    def status(self, status: str):
+        """Sets the status of this CertBatchItem.
+
+        State of the certificate creation  # noqa: E501
+
+        :param status: The status of this CertBatchItem.
+        :type status: str
+        """
+        allowed_values = ["In progress", "Finished", "Finished without certificate", "Error"]  # noqa: E501
+        if status not in allowed_values:
+            raise ValueError(
+                "Invalid value for `status` ({0}), must be one of {1}"
+                .format(status, allowed_values)
+            )
+
+        self._status = status
+
+    @property
+    def job(self) -> str:
+        """Gets the job of this CertBatchItem.
+
+        URL to poll for the status of the certificate creation  # noqa: E501
+
+        :return: The job of this CertBatchItem.
+        :rtype: str
+        """
+        return self._job
+
+    @job.setter
+    def job(self, job: str):
+        """Sets the job of this CertBatchItem.
+
+        URL to poll for the status of the certificate creation  # noqa: E501
+
+        :param job: The job of this CertBatchItem.
+        :type job: str
+        """
+
+        self._job = job
+
+    @property
+    def certificate(self) -> str:
+        """Gets the certificate of this CertBatchItem.
+
+        URL pointing to the certificate, set if it has already been created  # noqa: E501
+
+        :return: The certificate of this CertBatchItem.
+        :rtype: str
+        """
+        return self._certificate
+
+    @certificate.setter
+    def certificate(self, certificate: str):
+        """Sets the certificate of this CertBatchItem.
+
+        URL pointing to the certificate, set if it has already been created  # noqa: E501
+
+        :param certificate: The certificate of this CertBatchItem.
+        :type certificate: str
+        """
+
+        self._certificate = certificate
@@ -0,0 +1,64 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server import util
+
+
+class CertJob(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    def __init__(self, job: str=None):  # noqa: E501
+        """CertJob - a model defined in Swagger
+
+        :param job: The job of this CertJob.  # noqa: E501
+        :type job: str
+        """
+        self.swagger_types = {
+            'job': str
+        }
+
+        self.attribute_map = {
+            'job': 'job'
+        }
+        self._job = job
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'CertJob':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The CertJob of this CertJob.  # noqa: E501
+        :rtype: CertJob
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def job(self) -> str:
+        """Gets the job of this CertJob.
+
+        URL to poll for the status of the certificate creation  # noqa: E501
+
+        :return: The job of this CertJob.
+        :rtype: str
+        """
+        return self._job
+
+    @job.setter
+    def job(self, job: str):
+        """Sets the job of this CertJob.
+
+        URL to poll for the status of the certificate creation  # noqa: E501
+
+        :param job: The job of this CertJob.
+        :type job: str
+        """
+
+        self._job = job
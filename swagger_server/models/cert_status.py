@@ -0,0 +1,126 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server import util
+
+
+class CertStatus(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    def __init__(self, status: str=None, certificate: str=None, message: str=None):  # noqa: E501
+        """CertStatus - a model defined in Swagger
+
+        :param status: The status of this CertStatus.  # noqa: E501
+        :type status: str
+        :param certificate: The certificate of this CertStatus.  # noqa: E501
+        :type certificate: str
+        :param message: The message of this CertStatus.  # noqa: E501
+        :type message: str
+        """
+        self.swagger_types = {
+            'status': str,
+            'certificate': str,
+            'message': str
+        }
+
+        self.attribute_map = {
+            'status': 'status',
+            'certificate': 'certificate',
+            'message': 'message'
+        }
+        self._status = status
+        self._certificate = certificate
+        self._message = message
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'CertStatus':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The CertStatus of this CertStatus.  # noqa: E501
+        :rtype: CertStatus
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def status(self) -> str:
+        """Gets the status of this CertStatus.
+
+        State of the certificate creation  # noqa: E501
+
+        :return: The status of this CertStatus.
+        :rtype: str
+        """
+        return self._status
+
+    @status.setter
+    def status(self, status: str):
+        """Sets the status of this CertStatus.
+
+        State of the certificate creation  # noqa: E501
+
+        :param status: The status of this CertStatus.
+        :type status: str
+        """
+        allowed_values = ["In progress", "Finished", "Finished without certificate", "Error"]  # noqa: E501
+        if status not in allowed_values:
+            raise ValueError(
+                "Invalid value for `status` ({0}), must be one of {1}"
+                .format(status, allowed_values)
+            )
+
+        self._status = status
+
+    @property
+    def certificate(self) -> str:
+        """Gets the certificate of this CertStatus.
+
+        URL pointing to the certificate, set once the creation has finished  # noqa: E501
+
+        :return: The certificate of this CertStatus.
+        :rtype: str
+        """
+        return self._certificate
+
+    @certificate.setter
+    def certificate(self, certificate: str):
+        """Sets the certificate of this CertStatus.
+
+        URL pointing to the certificate, set once the creation has finished  # noqa: E501
+
+        :param certificate: The certificate of this CertStatus.
+        :type certificate: str
+        """
+
+        self._certificate = certificate
+
+    @property
+    def message(self) -> str:
+        """Gets the message of this CertStatus.
+
+        Error message if the creation failed  # noqa: E501
+
+        :return: The message of this CertStatus.
+        :rtype: str
+        """
+        return self._message
+
+    @message.setter
+    def message(self, message: str):
+        """Sets the message of this CertStatus.
+
+        Error message if the creation failed  # noqa: E501
+
+        :param message: The message of this CertStatus.
+        :type message: str
+        """
+
+        self._message = message
@@ -0,0 +1,92 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server import util
+
+
+class Readiness(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    def __init__(self, ready: bool=None, renderers: int=None):  # noqa: E501
+        """Readiness - a model defined in Swagger
+
+        :param ready: The ready of this Readiness.  # noqa: E501
+        :type ready: bool
+        :param renderers: The renderers of this Readiness.  # noqa: E501
+        :type renderers: int
+        """
+        self.swagger_types = {
+            'ready': bool,
+            'renderers': int
+        }
+
+        self.attribute_map = {
+            'ready': 'ready',
+            'renderers': 'renderers'
+        }
+        self._ready = ready
+        self._renderers = renderers
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'Readiness':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The Readiness of this Readiness.  # noqa: E501
+        :rtype: Readiness
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def ready(self) -> bool:
+        """Gets the ready of this Readiness.
+
+        True once at least one worker has warmed up its render engine  # noqa: E501
+
+        :return: The ready of this Readiness.
+        :rtype: bool
+        """
+        return self._ready
+
+    @ready.setter
+    def ready(self, ready: bool):
+        """Sets the ready of this Readiness.
+
+        True once at least one worker has warmed up its render engine  # noqa: E501
+
+        :param ready: The ready of this Readiness.
+        :type ready: bool
+        """
+
+        self._ready = ready
+
+    @property
+    def renderers(self) -> int:
+        """Gets the renderers of this Readiness.
+
+        Number of warmed-up worker processes  # noqa: E501
+
+        :return: The renderers of this Readiness.
+        :rtype: int
+        """
+        return self._renderers
+
+    @renderers.setter
+    def renderers(self, renderers: int):
+        """Sets the renderers of this Readiness.
+
+        Number of warmed-up worker processes  # noqa: E501
+
+        :param renderers: The renderers of this Readiness.
+        :type renderers: int
+        """
+
+        self._renderers = renderers
@@ -0,0 +1,18 @@
+"""
+Preload of the render libraries
+
+Importing this module imports everything the render processes use: WeasyPrint, matplotlib (for PNG charts) and the
+render modules. With constants.render_preload, the forkserver of the render pool imports it once before forking the
+render processes, see render_pool.py.
+"""
+import weasyprint  # noqa: F401
+import weasyprint.text.fonts  # noqa: F401
+
+from swagger_server import chart  # noqa: F401
+from swagger_server import constants as c
+from swagger_server import render  # noqa: F401
+from swagger_server import templates  # noqa: F401
+
+if c.chart_backend == 'png':
+    import matplotlib.backends.backend_agg  # noqa: F401
+    import matplotlib.figure  # noqa: F401
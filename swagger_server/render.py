@@ -0,0 +1,127 @@
+"""
+PDF rendering of the certificates
+
+The filled template is passed to WeasyPrint as a string and the PDF is returned as bytes, no intermediate files are
+written. Images are served by a custom URL fetcher: the logos from an in-memory cache loaded once per process, the
+chart from the assets passed with each document.
+The stylesheet and the font configuration are prepared once per process by the render engine.
+WeasyPrint is only imported by the processes which render, see render_client.py.
+"""
+import functools
+import mimetypes
+import os
+import threading
+import time
+from urllib.parse import unquote, urlparse
+
+from swagger_server import constants as c
+from swagger_server import util
+from swagger_server.controllers.__init__ import logger
+
+_static_assets = {}
+_static_assets_lock = threading.Lock()
+
+
+def _static_asset(path):
+    with _static_assets_lock:
+        asset = _static_assets.get(path)
+        if asset is None:
+            with open(path, 'rb') as f:
+                asset = _static_assets[path] = f.read()
+        return asset
+
+
+def _url_fetcher(url, timeout=10, ssl_context=None, assets=None):
+    """URL fetcher for WeasyPrint, serving the files of the certificate directory from memory.
+
+    :param assets: files of this document, e.g. the chart, by name relative to the certificate directory
+    :type assets: dict[str, bytes]
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == 'file':
+        path = os.path.normpath(unquote(parsed.path))
+        name = os.path.relpath(path, c.cert_files_dir)
+        if assets and name in assets:
+            data = assets[name]
+        elif path.startswith(c.template_dir + os.sep):
+            data = _static_asset(path)
+        else:
+            data = None
+        if data is not None:
+            return {
+                'string': data,
+                'mime_type': mimetypes.guess_type(path)[0],
+                'redirected_url': url,
+            }
+    from weasyprint import default_url_fetcher
+    return default_url_fetcher(url, timeout=timeout, ssl_context=ssl_context)
+
+
+class RenderEngine:
+    """WeasyPrint state shared by all documents of a process: the stylesheet of the certificate templates is parsed
+    once and the font configuration is reused. warm_up() renders a document once, so the first certificate does not
+    pay for the initialisation of fontconfig and Pango.
+    """
+    def __init__(self):
+        from weasyprint import CSS
+        from weasyprint.text.fonts import FontConfiguration
+
+        self.font_config = FontConfiguration()
+        self.stylesheet = CSS(filename=c.cert_stylesheet, font_config=self.font_config, url_fetcher=_url_fetcher)
+        self.ready = threading.Event()
+
+    def html_to_pdf(self, html, assets=None):
+        """Render a certificate document to PDF. Relative URLs in the document are resolved from the certificate
+        directory.
+
+        :param html: filled certificate template
+        :type html: str
+        :param assets: files referenced by the document which are not on disk, by name relative to the certificate
+                       directory
+        :type assets: dict[str, bytes]
+
+        :return: PDF document
+        :rtype: bytes
+        """
+        from weasyprint import HTML
+
+        url_fetcher = functools.partial(_url_fetcher, assets=assets)
+        document = HTML(string=html, base_url=c.cert_files_dir + os.sep, url_fetcher=url_fetcher)
+        return document.write_pdf(stylesheets=[self.stylesheet], font_config=self.font_config)
+
+    def warm_up(self):
+        """Render a small document with the fonts and styles of the certificates."""
+        if self.ready.is_set():
+            return
+        start = time.perf_counter()
+        self.html_to_pdf(_warm_up_document)
+        self.ready.set()
+        logger.info("Render engine ready after %.2f seconds", time.perf_counter() - start)
+
+
+_warm_up_document = """\
+<html><body>
+<header><img src="template/5gasp_logo.png" class="logo-center"/></header>
+<p><span style="font-size:2em">5GASP</span></p>
+<p><i>Warm-up</i></p>
+<table><tr><th>Date</th><th>Test result</th></tr><tr><td>01/01/2023</td><td>Passed</td></tr></table>
+<footer>5GASP</footer>
+</body></html>
+"""
+
+
+@util.per_process
+def get_engine():
+    """Return the render engine of this process.
+
+    :rtype: RenderEngine
+    """
+    return RenderEngine()
+
+
+def html_to_pdf(html, assets=None):
+    """Render a certificate document to PDF with the render engine of this process, see RenderEngine.html_to_pdf().
+
+    :rtype: bytes
+    """
+    return get_engine().html_to_pdf(html, assets)
@@ -0,0 +1,165 @@
+"""
+Renderers of the certificate documents
+
+The worker hands the render stage of a certificate (cert_entity.render_document()) to the renderer selected by
+constants.renderer, which returns the document as PDF:
+- pool: the render pool of the worker process, see render_pool.py.
+- socket: the renderer service, a separate process reached over a Unix socket (see renderer.py). The API, the workers
+  and the renderers can then be scaled and limited in memory each on their own.
+- inline: the calling thread, a stand-in for tests without render processes.
+"""
+import concurrent.futures
+import queue
+import time
+from multiprocessing.connection import Client
+
+from swagger_server import cert_entity
+from swagger_server import constants as c
+from swagger_server import metrics
+from swagger_server import tracing
+from swagger_server import util
+from swagger_server.controllers.__init__ import logger
+
+
+class RenderError(Exception):
+    """A document could not be rendered."""
+
+
+class RenderTimeout(RenderError):
+    """A render took longer than constants.render_timeout."""
+
+
+class PoolRenderer:
+    """Render in the render pool of this process."""
+
+    def start(self):
+        """Prepare the renderer before the first document, here by warming up the render pool."""
+        from swagger_server import render_pool
+        render_pool.get_pool().warm_up()
+
+    def render(self, base_dict, axis_scores, min_req, base_info, test_bed, chart_image=None):
+        """Render a certificate document, see cert_entity.render_document().
+
+        :return: True if document is certificate, else False, filename of the radar chart, name of the document, the
+                 document as PDF and the PNG image of the radar chart
+        :rtype: bool, str, str, bytes, bytes
+        :raises RenderTimeout: if the render took longer than constants.render_timeout
+        """
+        from swagger_server import render_pool
+        # The render process collects its metrics, they are recorded here
+        try:
+            result, recorder = render_pool.get_pool().run(metrics.run_recorded, cert_entity.render_document, base_dict,
+                                                          axis_scores, min_req, base_info, test_bed, chart_image)
+        except concurrent.futures.TimeoutError as e:
+            raise RenderTimeout(str(e))
+        recorder.record()
+        return result
+
+    def shutdown(self):
+        """Stop the renderer, after the running renders are done."""
+        from swagger_server import render_pool
+        render_pool.get_pool().shutdown()
+
+
+class InlineRenderer:
+    """Render in the calling thread."""
+
+    def start(self):
+        pass
+
+    def render(self, base_dict, axis_scores, min_req, base_info, test_bed, chart_image=None):
+        return cert_entity.render_document(base_dict, axis_scores, min_req, base_info, test_bed, chart_image)
+
+    def shutdown(self):
+        pass
+
+
+class SocketRenderer:
+    """Render in the renderer service. Connections are kept open and reused by the threads of the process, one request
+    at a time per connection.
+
+    :param address: path of the Unix socket of the renderer service
+    :type address: str
+    :param authkey: shared secret of the renderer service
+    :type authkey: bytes
+    :raises ValueError: without a shared secret, the messages (pickles) of the renderer service would be trusted from
+                        anyone who can connect to its socket
+    """
+    def __init__(self, address, authkey):
+        if not authkey:
+            raise ValueError("RENDERER_AUTHKEY must be set to the shared secret of the renderer service")
+        self.address = address
+        self.authkey = authkey
+        self._idle = queue.LifoQueue()
+
+    def _connection(self):
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return Client(self.address, family='AF_UNIX', authkey=self.authkey), False
+
+    def _request(self, message, timeout=None):
+        while True:
+            conn, reused = self._connection()
+            try:
+                conn.send(message)
+                if timeout is not None and not conn.poll(timeout):
+                    # The answer may still come, the connection cannot be used for other requests
+                    conn.close()
+                    raise RenderTimeout(f"No answer from the renderer service within {timeout} seconds")
+                status, value = conn.recv()
+            except (EOFError, OSError):
+                conn.close()
+                if reused:
+                    # The renderer service was restarted since the connection was last used, try another one
+                    continue
+                raise
+            self._idle.put(conn)
+            if status != 'ok':
+                raise RenderError(value)
+            return value
+
+    def start(self):
+        """Wait until the renderer service answers, for up to constants.renderer_connect_timeout seconds."""
+        deadline = time.monotonic() + c.renderer_connect_timeout
+        while True:
+            try:
+                self._request(('ping',))
+                logger.info("Renderer service at '%s' is ready", self.address)
+                return
+            except OSError as e:
+                if time.monotonic() >= deadline:
+                    raise
+                logger.info("Waiting for the renderer service at '%s': %s", self.address, e)
+                time.sleep(1)
+
+    def render(self, base_dict, axis_scores, min_req, base_info, test_bed, chart_image=None):
+        """Render a certificate document in the renderer service, see PoolRenderer.render().
+
+        :raises RenderError: if the renderer service could not render the document or did not answer in time
+        :raises OSError, EOFError: if the renderer service cannot be reached
+        """
+        result, recorder = self._request(('render', (base_dict, axis_scores, min_req, base_info, test_bed, chart_image),
+                                          tracing.inject()), c.render_timeout + c.renderer_reply_margin)
+        recorder.record()
+        return result
+
+    def shutdown(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+@util.per_process
+def get_renderer():
+    """Return the renderer of this process, see constants.renderer.
+
+    :rtype: PoolRenderer or SocketRenderer or InlineRenderer
+    """
+    if c.renderer == 'socket':
+        return SocketRenderer(c.renderer_socket, c.renderer_authkey)
+    elif c.renderer == 'inline':
+        return InlineRenderer()
+    return PoolRenderer()
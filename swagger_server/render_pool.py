@@ -0,0 +1,154 @@
+"""
+Render pool
+
+The CPU-bound render stage of the certificates (chart, template, PDF) runs in a pool of child processes, apart from the
+threads which fetch the data and save the outcome. At most constants.render_max_in_flight tasks are submitted at a time,
+further callers wait for a free slot. Each child is replaced after constants.render_max_tasks tasks, so memory held by
+the render libraries is given back regularly. If a child dies, the pool is started again. A render which takes longer
+than constants.render_timeout is given up: the children are killed, so the hung one is freed, and the pool is started
+again. The other renders running at that time fail as well.
+
+The children are started with the spawn method: the worker has threads and open Redis connections, which must not be
+inherited by a fork. With constants.render_preload, they are forked from a forkserver instead: a clean process started
+the same way, which imports the render libraries once (see preload.py). The children then start without importing them
+again and share those memory pages with the forkserver until they write to them.
+"""
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from swagger_server import constants as c
+from swagger_server import tracing
+from swagger_server import util
+from swagger_server.controllers.__init__ import logger
+
+
+def _init_child():
+    # Warm up the render engine of a new child before it takes its first task
+    from swagger_server import render
+    render.get_engine().warm_up()
+
+
+def _ready(_):
+    return os.getpid()
+
+
+class RenderPool:
+    """Pool of render processes.
+
+    :param processes: number of child processes
+    :type processes: int
+    :param max_in_flight: maximum number of tasks submitted at a time
+    :type max_in_flight: int
+    :param max_tasks: number of tasks after which a child is replaced
+    :type max_tasks: int
+    """
+    def __init__(self, processes, max_in_flight, max_tasks):
+        self.processes = processes
+        self.max_tasks = max_tasks
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._tasks = 0
+        # Before Python 3.11, children cannot be replaced one by one: the whole pool is replaced instead, once it ran
+        # max_tasks tasks per child.
+        self._native_recycling = sys.version_info >= (3, 11)
+        if c.render_preload:
+            self._context = multiprocessing.get_context('forkserver')
+            self._context.set_forkserver_preload(['swagger_server.preload'])
+        else:
+            self._context = multiprocessing.get_context('spawn')
+
+    def _new_executor(self):
+        kwargs = {}
+        if self._native_recycling:
+            kwargs['max_tasks_per_child'] = self.max_tasks
+        return ProcessPoolExecutor(self.processes, mp_context=self._context, initializer=_init_child, **kwargs)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is not None and not self._native_recycling \
+                    and self._tasks >= self.processes * self.max_tasks:
+                # The old children exit once their running tasks are done
+                self._executor.shutdown(wait=False)
+                self._executor = None
+                logger.info("Render pool replaced after its task limit")
+            if self._executor is None:
+                self._executor = self._new_executor()
+                self._tasks = 0
+            self._tasks += 1
+            return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                logger.error("A render process died, the render pool is started again")
+
+    def _kill(self, executor):
+        # A render which does not end keeps its child busy, only killing the children frees it
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        # The executor has no public way to stop its children before Python 3.14 (terminate_workers)
+        processes = list((executor._processes or {}).values())
+        executor.shutdown(wait=False)
+        for process in processes:
+            process.kill()
+        logger.error("A render took longer than %s seconds, the render pool is started again", c.render_timeout)
+
+    def run(self, fn, *args):
+        """Run a function in a render process and return its result. Blocks while max_in_flight tasks are running.
+
+        :param fn: module-level function
+        :type fn: callable
+        :param args: arguments of the function, must be picklable
+
+        :return: result of the function
+        :raises concurrent.futures.TimeoutError: if the result was not there within constants.render_timeout seconds,
+                including the wait for a free slot
+        """
+        deadline = time.monotonic() + c.render_timeout
+        if not self._slots.acquire(timeout=c.render_timeout):
+            raise concurrent.futures.TimeoutError(f"No render process was free within {c.render_timeout} seconds")
+        try:
+            executor = self._get_executor()
+            # The task continues the trace of the caller
+            future = executor.submit(tracing.run_attached, tracing.inject(), fn, *args)
+            try:
+                return future.result(timeout=max(deadline - time.monotonic(), 0))
+            except BrokenProcessPool:
+                self._reset(executor)
+                raise
+            except concurrent.futures.TimeoutError:
+                self._kill(executor)
+                raise concurrent.futures.TimeoutError(f"The render took longer than {c.render_timeout} seconds")
+        finally:
+            self._slots.release()
+
+    def warm_up(self):
+        """Start all child processes and wait until their render engines are warmed up."""
+        executor = self._get_executor()
+        pids = set(executor.map(_ready, range(self.processes)))
+        logger.info("Render pool ready with processes %s", sorted(pids))
+
+    def shutdown(self):
+        """Stop the pool, after the running tasks are done."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+@util.per_process
+def get_pool():
+    """Return the render pool of this process.
+
+    :rtype: RenderPool
+    """
+    return RenderPool(c.worker_processes, c.render_max_in_flight, c.render_max_tasks)
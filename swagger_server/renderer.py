@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Start the renderer service: it renders the certificate documents of the workers (see render_client.SocketRenderer) in
+its render pool and sends them back as PDF. The workers connect over a Unix socket, each connection is served by a
+thread of its own, the render pool limits how many documents are rendered at a time.
+"""
+import os
+import signal
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+
+from swagger_server import __init__
+from swagger_server import cert_entity
+from swagger_server import constants as c
+from swagger_server import metrics
+from swagger_server import render_pool
+from swagger_server import tracing
+from swagger_server.controllers.__init__ import logger
+
+
+def _serve(conn, pool):
+    # Answer the requests of one connection until the worker closes it
+    with conn:
+        while True:
+            try:
+                request, *args = conn.recv()
+            except (EOFError, OSError):
+                return
+            if request == 'ping':
+                response = ('ok', True)
+            elif request == 'render':
+                render_args, traceparent = args
+                try:
+                    # The metrics of the render are sent back with the document and recorded by the worker
+                    with tracing.attach(traceparent):
+                        response = ('ok', pool.run(metrics.run_recorded, cert_entity.render_document, *render_args))
+                except Exception as e:
+                    logger.exception("Could not render document: %s", e)
+                    response = ('error', f"Could not render document: {e}")
+            else:
+                response = ('error', f"Unknown request '{request}'")
+            try:
+                conn.send(response)
+            except OSError:
+                return
+
+
+def main():
+    # The requests are pickles, which may run code when they are loaded: only authenticated workers may send them
+    if not c.renderer_authkey:
+        logger.error("The renderer service does not start without RENDERER_AUTHKEY")
+        raise SystemExit("RENDERER_AUTHKEY must be set to the shared secret of the renderer service and the workers")
+    pool = render_pool.get_pool()
+    pool.warm_up()
+    os.makedirs(os.path.dirname(c.renderer_socket), exist_ok=True)
+    if os.path.exists(c.renderer_socket):
+        os.unlink(c.renderer_socket)
+    # Only the user and the group of the service may connect
+    umask = os.umask(0o117)
+    try:
+        listener = Listener(c.renderer_socket, family='AF_UNIX', authkey=c.renderer_authkey)
+    finally:
+        os.umask(umask)
+
+    def stop(signum, frame):
+        pool.shutdown()
+        listener.close()
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logger.info("Renderer service listening on '%s'", c.renderer_socket)
+    while True:
+        try:
+            conn = listener.accept()
+        except (AuthenticationError, OSError) as e:
+            logger.warning("Rejected connection to the renderer service: %s", e)
+            continue
+        threading.Thread(target=_serve, args=(conn, pool), name='render', daemon=True).start()
+
+
+if __name__ == '__main__':
+    main()
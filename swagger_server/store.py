@@ -0,0 +1,346 @@
+"""
+State of the certificate creations
+
+Each testing has one Redis hash (constants.cert_key_prefix + test_id) with the fields of its certificate creation:
+access_token, status, fence, cert (file relative to the certificate directory), cert_name (name for downloads), chart,
+error and updated_at. Every state transition is a single command or Lua script, so it is atomic and takes one round
+trip.
+
+Only one process works on a creation at a time. Starting a creation takes a fencing token, which is stored in the hash
+and passed with the job, and marks the creation as queued: its lease key (an expiring key) holds the token and expires
+only after cert_queue_timeout. The worker which takes the job from the queue takes the lease with a holder token of its
+own and the short cert_lease_timeout, and renews it while it runs the job. The outcome is only saved if the hash still
+has the job's fencing token. If a worker dies, its jobs are put back on the queue (see jobs.recover()) or its lease
+expires and the creation can be started again; the outcome of the old worker is then discarded.
+When a creation ends, its status is published on a channel, so clients can wait for it.
+"""
+import secrets
+import threading
+import time
+
+from swagger_server import constants as c
+from swagger_server import metrics
+from swagger_server.controllers.__init__ import logger, mRedis
+
+# Claim a certificate creation: unless a certificate exists or another creation is queued or holds the lease, mark it as
+# queued with a new fencing token and reset the hash to a new creation in progress.
+# Returns {0, token} if claimed, otherwise {status of the existing creation, 0}.
+_start_script = mRedis.register_script("""
+local status = tonumber(redis.call('HGET', KEYS[1], 'status'))
+if status == tonumber(ARGV[3]) then
+    return {status, 0}
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return {tonumber(ARGV[2]), 0}
+end
+local fence = redis.call('INCR', KEYS[3])
+redis.call('SET', KEYS[2], fence, 'PX', ARGV[5])
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], 'access_token', ARGV[1], 'status', ARGV[2], 'fence', fence, 'updated_at', ARGV[4])
+return {0, fence}
+""")
+# Take or renew the lease of a creation in progress for a holder token, if the fencing token is still current and the
+# creation is queued (the lease holds the fencing token), has no lease or its lease is already held with the holder
+# token.
+# ARGV: fencing token, holder token, expiry in ms, status in progress. Returns 1 if the lease is held.
+_acquire_script = mRedis.register_script("""
+if redis.call('HGET', KEYS[1], 'fence') ~= ARGV[1] or redis.call('HGET', KEYS[1], 'status') ~= ARGV[4] then
+    return 0
+end
+local holder = redis.call('GET', KEYS[2])
+if holder and holder ~= ARGV[1] and holder ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[2], 'PX', ARGV[3])
+return 1
+""")
+# Mark a creation in progress as queued again, if the fencing token is still current. Returns 1 if marked.
+_queue_script = mRedis.register_script("""
+if redis.call('HGET', KEYS[1], 'fence') ~= ARGV[1] or redis.call('HGET', KEYS[1], 'status') ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[1], 'PX', ARGV[3])
+return 1
+""")
+# Save the outcome of a creation if the fencing token is still current, release the lease (queued or held for the
+# token) and publish the status.
+# ARGV: token, channel, status, then further field/value pairs. Returns 1 if saved.
+_end_script = mRedis.register_script("""
+if redis.call('HGET', KEYS[1], 'fence') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', ARGV[3], unpack(ARGV, 4))
+local holder = redis.call('GET', KEYS[2])
+if holder and (holder == ARGV[1] or string.find(holder, ARGV[1] .. ':', 1, true) == 1) then
+    redis.call('DEL', KEYS[2])
+end
+redis.call('PUBLISH', ARGV[2], ARGV[3])
+return 1
+""")
+
+
+def _key(test_id):
+    return f"{c.cert_key_prefix}{test_id}"
+
+
+def _lease_key(test_id):
+    return f"{c.cert_key_prefix}{test_id}:lease"
+
+
+def _channel(test_id):
+    return f"{c.cert_key_prefix}{test_id}:done"
+
+
+def get(test_id, *fields):
+    """Return fields of the certificate creation of a testing.
+
+    :param test_id:
+    :type test_id: int
+    :param fields: names of the fields
+    :type fields: str
+
+    :return: decoded values in the order of the fields, None for missing fields or if there is no certificate creation
+    :rtype: list[str]
+    """
+    return [x.decode() if x is not None else None for x in mRedis.hmget(_key(test_id), fields)]
+
+
+def document_files():
+    """Return the documents which the certificate creations refer to.
+
+    :return: filenames relative to the certificate directory
+    :rtype: set[str]
+    """
+    files = set()
+    keys = [x for x in mRedis.scan_iter(match=f"{c.cert_key_prefix}*", count=1000)
+            if x.decode()[len(c.cert_key_prefix):].isdigit()]
+    for i in range(0, len(keys), 1000):
+        pipe = mRedis.pipeline(transaction=False)
+        for key in keys[i:i + 1000]:
+            pipe.hget(key, 'cert')
+        files.update(x.decode() for x in pipe.execute() if x)
+    return files
+
+
+def start(test_id, access_token):
+    """Start a certificate creation for a testing and mark it as queued, unless the certificate already exists or
+    another creation is queued or holds the lease.
+
+    :param test_id:
+    :type test_id: int
+    :param access_token:
+    :type access_token: str
+
+    :return: status of the existing creation (0 if the creation was started), fencing token of the new creation
+    :rtype: int, int
+    """
+    status, fence = _start_script(
+        keys=[_key(test_id), _lease_key(test_id), c.cert_fence_key],
+        args=[access_token, c.status_progress, c.status_finished, time.time(), c.cert_queue_timeout * 1000])
+    if not int(status):
+        metrics.creation(c.status_progress)
+    return int(status), int(fence)
+
+
+def start_many(creations):
+    """Start the certificate creations for several testings in one round trip, see start().
+
+    :param creations: test_id and access_token of each testing
+    :type creations: list[(int, str)]
+
+    :return: status of the existing creation and fencing token of the new creation for each testing
+    :rtype: list[(int, int)]
+    """
+    pipe = mRedis.pipeline(transaction=False)
+    for test_id, access_token in creations:
+        _start_script(keys=[_key(test_id), _lease_key(test_id), c.cert_fence_key],
+                      args=[access_token, c.status_progress, c.status_finished, time.time(),
+                            c.cert_queue_timeout * 1000],
+                      client=pipe)
+    started = [(int(status), int(fence)) for status, fence in pipe.execute()]
+    for status, _ in started:
+        if not status:
+            metrics.creation(c.status_progress)
+    return started
+
+
+def requeue(creations):
+    """Mark certificate creations as queued again, e.g. when their jobs are put back on the queue. Creations which were
+    started again or have ended meanwhile are left as they are.
+
+    :param creations: test_id and fencing token of each creation
+    :type creations: list[(int, int)]
+
+    :return: for each creation, True if it is marked as queued
+    :rtype: list[bool]
+    """
+    pipe = mRedis.pipeline(transaction=False)
+    for test_id, fence in creations:
+        _queue_script(keys=[_key(test_id), _lease_key(test_id)],
+                      args=[fence, c.status_progress, c.cert_queue_timeout * 1000], client=pipe)
+    return [bool(x) for x in pipe.execute()]
+
+
+def lease_alive(test_id):
+    """Return if the certificate creation of a testing is queued or a process holds its lease.
+
+    :rtype: bool
+    """
+    return bool(mRedis.exists(_lease_key(test_id)))
+
+
+class Lease:
+    """Lease of a queued certificate creation for the worker which runs its job. While held, the lease is renewed in a
+    background thread.
+
+    :param test_id:
+    :type test_id: int
+    :param fence: fencing token from start()
+    :type fence: int
+    """
+    def __init__(self, test_id, fence):
+        self.test_id = test_id
+        self.fence = fence
+        # Tells this run of the job from other runs with the same fencing token, e.g. after the job was put back
+        self.token = f"{fence}:{secrets.token_hex(8)}"
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _acquire(self):
+        return bool(_acquire_script(keys=[_key(self.test_id), _lease_key(self.test_id)],
+                                    args=[self.fence, self.token, c.cert_lease_timeout * 1000,
+                                          c.status_progress]))
+
+    def _renew(self):
+        while not self._stop.wait(c.cert_lease_renew_interval):
+            try:
+                if not self._acquire():
+                    logger.warning("test_id '%s': Lost the lease of the certificate creation", self.test_id)
+                    return
+            except Exception as e:
+                logger.error("test_id '%s': Could not renew the lease: %s", self.test_id, e)
+
+    def __enter__(self):
+        """Take the lease and start renewing it.
+
+        :return: True if the lease is held, False if the creation was started again, has ended or is run by another
+                 worker
+        :rtype: bool
+        """
+        if not self._acquire():
+            return False
+        self._thread = threading.Thread(target=self._renew, name=f'lease-{self.test_id}', daemon=True)
+        self._thread.start()
+        return True
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+def _end(test_id, fence, status, fields):
+    args = [fence, _channel(test_id), status]
+    for field, value in fields.items():
+        args += [field, value]
+    saved = bool(_end_script(keys=[_key(test_id), _lease_key(test_id)], args=args))
+    if saved:
+        metrics.creation(status)
+    return saved
+
+
+def finish(test_id, fence, is_cert, cert_file, cert_name, chart):
+    """Save the outcome of a successful certificate creation.
+
+    :param test_id:
+    :type test_id: int
+    :param fence: fencing token of the creation
+    :type fence: int
+    :param is_cert: True if the document is a certificate, False for an intermediary result
+    :type is_cert: bool
+    :param cert_file: filename of the document relative to the certificate directory
+    :type cert_file: str
+    :param cert_name: filename of the document for downloads
+    :type cert_name: str
+    :param chart: filename of the radar chart
+    :type chart: str
+
+    :return: False if the creation was started again meanwhile and the outcome was discarded
+    :rtype: bool
+    """
+    return _end(test_id, fence, c.status_finished if is_cert else c.status_finished_no_cert, {
+        'cert': cert_file,
+        'cert_name': cert_name,
+        'chart': chart,
+        'updated_at': time.time(),
+    })
+
+
+def fail(test_id, fence, err_msg):
+    """Save the error of a failed certificate creation.
+
+    :param test_id:
+    :type test_id: int
+    :param fence: fencing token of the creation
+    :type fence: int
+    :param err_msg: error message for the client
+    :type err_msg: str
+
+    :return: False if the creation was started again meanwhile and the error was discarded
+    :rtype: bool
+    """
+    return _end(test_id, fence, c.status_error, {
+        'error': err_msg,
+        'updated_at': time.time(),
+    })
+
+
+def wait(test_id, timeout):
+    """Wait until the certificate creation of a testing is not in progress anymore.
+
+    :param test_id:
+    :type test_id: int
+    :param timeout: maximum time to wait in seconds
+    :type timeout: float
+
+    :return: status of the creation, None if there is none
+    :rtype: int
+    """
+    deadline = time.monotonic() + timeout
+    pubsub = mRedis.pubsub(ignore_subscribe_messages=True)
+    # Subscribe before reading the status, so the end of the creation cannot be missed
+    pubsub.subscribe(_channel(test_id))
+    try:
+        while True:
+            status, = get(test_id, 'status')
+            status = int(status) if status else None
+            remaining = deadline - time.monotonic()
+            if status != c.status_progress or remaining <= 0 or not lease_alive(test_id):
+                return status
+            pubsub.get_message(timeout=min(remaining, 1))
+    finally:
+        pubsub.close()
+
+
+def migrate():
+    """Move certificate creations from the separate keys of earlier versions (test_id, test_id_access_token,
+    test_id_status, test_id_cert, ...) into their hashes.
+    """
+    legacy_fields = ['access_token', 'status', 'cert', 'cert_name', 'chart', 'error']
+    migrated = 0
+    for status_key in mRedis.scan_iter(match='*_status', count=1000):
+        test_id = status_key.decode()[:-len('_status')]
+        if not test_id.isdigit():
+            continue
+        legacy_keys = [f"{test_id}_{x}" for x in legacy_fields]
+        values = mRedis.mget(legacy_keys)
+        pipe = mRedis.pipeline()
+        pipe.hsetnx(_key(test_id), 'updated_at', time.time())
+        for field, value in zip(legacy_fields, values):
+            if value is not None:
+                pipe.hsetnx(_key(test_id), field, value)
+        pipe.delete(test_id, *legacy_keys)
+        pipe.execute()
+        migrated += 1
+    if migrated:
+        logger.info("Migrated %d certificate creations to hashes", migrated)
@@ -0,0 +1,115 @@
+"""
+Streaming JSON parsing of CI/CD Manager responses
+
+The large responses of the CI/CD Manager (the test catalog with all test beds, the performed tests of a testing) are
+parsed with ijson while they are read from the connection, instead of reading the whole body and decoding it at once.
+Only the parts which are needed are kept: the test cases of one test bed at a time, and a list of the performed tests
+with only the fields which are used for a certificate (constants.result_fields).
+Without ijson, or if constants.cicd_stream_json is off, the whole body is decoded with json as before.
+"""
+import hashlib
+
+import requests.exceptions
+
+from swagger_server import constants as c
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Bytes read from the connection at a time
+_chunk_size = 64 * 1024
+
+
+def enabled():
+    """Return if responses are parsed while they are read. Requests for such responses must be sent with stream=True.
+
+    :rtype: bool
+    """
+    return ijson is not None and c.cicd_stream_json
+
+
+class _Body:
+    """File-like reader of a response body for ijson, which hashes the body as it is read.
+
+    :param response: response sent with stream=True
+    :type response: requests.Response
+    """
+    def __init__(self, response):
+        self._chunks = response.iter_content(_chunk_size)
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        if size == 0:
+            # ijson reads 0 bytes to tell bytes from text
+            return b''
+        data = next(self._chunks, b'')
+        self.digest.update(data)
+        return data
+
+
+def _decode_error(uri, e):
+    return requests.exceptions.JSONDecodeError(f"Response from {uri} is not valid JSON: {e}", '', 0)
+
+
+def _compact_result(result):
+    return {k: result[k] for k in c.result_fields if k in result}
+
+
+def performed_tests(response, uri):
+    """Return the performed tests of a response from /gui/tests-performed, with only the fields in
+    constants.result_fields. The tests are parsed one at a time while the body is read, but all of them are returned
+    at once as a list: the body itself is never held in memory, the compacted list of the tests is.
+
+    :param response: response of the CI/CD Manager
+    :type response: requests.Response
+    :param uri: path of the endpoint, for error messages
+    :type uri: str
+
+    :return: performed tests (the data as is if it is not a list)
+    :rtype: list[dict]
+    :raises requests.exceptions.JSONDecodeError: if the body is not valid JSON
+    """
+    if not enabled():
+        data = response.json().get('data')
+        if not isinstance(data, list):
+            return data
+        return [_compact_result(x) if isinstance(x, dict) else x for x in data]
+    try:
+        return [_compact_result(x) if isinstance(x, dict) else x
+                for x in ijson.items(_Body(response), 'data.item', use_float=True)]
+    except ijson.JSONError as e:
+        raise _decode_error(uri, e)
+
+
+class CatalogTestBeds:
+    """Iterable of the test beds of a response from /tests/all, as (test bed ID, test case info of the test bed), one at
+    a time. Once the iteration is done, the digest of the whole body is set.
+
+    :param response: response of the CI/CD Manager
+    :type response: requests.Response
+    :param uri: path of the endpoint, for error messages
+    :type uri: str
+    """
+    def __init__(self, response, uri):
+        self.response = response
+        self.uri = uri
+        # SHA-256 hex digest of the body, set once all test beds have been read
+        self.digest = None
+
+    def __iter__(self):
+        if not enabled():
+            self.digest = hashlib.sha256(self.response.content).hexdigest()
+            tests = (self.response.json().get('data') or {}).get('tests') or {}
+            yield from tests.items()
+            return
+        body = _Body(self.response)
+        try:
+            yield from ijson.kvitems(body, 'data.tests', use_float=True)
+            # Hash the rest of the body as well
+            while body.read():
+                pass
+        except ijson.JSONError as e:
+            raise _decode_error(self.uri, e)
+        self.digest = body.digest.hexdigest()
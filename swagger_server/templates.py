@@ -0,0 +1,61 @@
+"""
+Certificate templates
+
+The templates are Jinja2 templates in the template directory. Each process compiles a template once and only
+compiles it again when the modification time of its file changes.
+version() identifies the content of the template directory, for the digest of rendered documents.
+"""
+import hashlib
+import os
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from swagger_server import constants as c
+
+_env = Environment(
+    loader=FileSystemLoader(c.template_dir, encoding='utf-8'),
+    autoescape=select_autoescape(['html']),
+    auto_reload=True,
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+
+
+def render(template_file, **context):
+    """Fill a template. The output is generated as a stream of chunks, so large test case tables are not built as
+    separate strings first.
+
+    :param template_file: path of the template in the template directory
+    :type template_file: str
+    :param context: values for the template
+
+    :return: the filled template
+    :rtype: str
+    """
+    template = _env.get_template(os.path.relpath(template_file, c.template_dir))
+    return ''.join(template.generate(**context))
+
+
+_version = {
+    'stamp': None,
+    'digest': '',
+}
+
+
+def version():
+    """Return the version of the certificate templates: a digest over all files of the template directory (templates,
+    stylesheet, logos). It is only computed again if a file was added, removed or modified.
+
+    :rtype: str
+    """
+    names = sorted(os.listdir(c.template_dir))
+    stamp = tuple((x, os.stat(os.path.join(c.template_dir, x)).st_mtime_ns) for x in names)
+    if stamp != _version['stamp']:
+        digest = hashlib.sha256()
+        for name in names:
+            digest.update(name.encode())
+            with open(os.path.join(c.template_dir, name), 'rb') as f:
+                digest.update(f.read())
+        _version['digest'] = digest.hexdigest()
+        _version['stamp'] = stamp
+    return _version['digest']
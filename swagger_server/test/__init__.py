@@ -1,10 +1,21 @@
 import logging
+import os
+import tempfile
 
 import connexion
 from flask_testing import TestCase
 
+# The metric files of the tests are not written to the metrics directory of the app
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', tempfile.mkdtemp(prefix='cert_metrics_'))
+
 from swagger_server.encoder import JSONEncoder
 
+try:
+    import fakeredis
+    import redis
+except ImportError:
+    fakeredis = None
+
 
 class BaseTestCase(TestCase):
 
@@ -14,3 +25,13 @@ class BaseTestCase(TestCase):
         app.app.json_encoder = JSONEncoder
         app.add_api('swagger.yaml')
         return app.app
+
+
+def use_fake_redis():
+    """Connect the Redis client of the app to a new, empty in-memory server (fakeredis, with Lua scripts through
+    lupa)."""
+    from swagger_server.controllers.__init__ import mRedis
+    # FakeConnection in older versions of fakeredis
+    connection_class = getattr(fakeredis, 'FakeRedisConnection', None) or fakeredis.FakeConnection
+    mRedis.connection_pool = redis.ConnectionPool(connection_class=connection_class, server=fakeredis.FakeServer())
+    return mRedis
@@ -0,0 +1,84 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+from swagger_server.test import fakeredis, use_fake_redis
+
+if fakeredis is not None:
+    from swagger_server import catalog
+    from swagger_server import constants as c
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class TestCatalog(unittest.TestCase):
+    """Local copy of the catalog and its revalidation"""
+
+    def setUp(self):
+        self.redis = use_fake_redis()
+        catalog._local().update(version=0, synced=0.0, tests={}, indexes={}, revalidating=False)
+
+    def _store(self, version, fetched_at, tests):
+        self.redis.hset(c.catalog_key, mapping={k: json.dumps(v) for k, v in tests.items()})
+        self.redis.hset(c.catalog_meta_key, mapping={'version': version, 'fetched_at': fetched_at})
+
+    def test_stale_catalog_is_served(self):
+        """A stored catalog older than the TTL is served at once and revalidated in the background"""
+        self._store(1, 0, {'tb': {'tc_1': {}}})
+        revalidated = threading.Event()
+
+        def refresh():
+            revalidated.wait(5)
+            return 1, ""
+
+        with mock.patch.object(catalog, 'refresh', side_effect=refresh) as refresh_mock:
+            start = time.monotonic()
+            self.assertEqual(catalog.get_tests('tb'), ({'tc_1': {}}, ""))
+            self.assertLess(time.monotonic() - start, 1)
+            # Only one revalidation at a time
+            catalog._local()['synced'] = 0
+            catalog.sync()
+            revalidated.set()
+            for _ in range(50):
+                if not catalog._local()['revalidating']:
+                    break
+                time.sleep(0.1)
+        self.assertEqual(refresh_mock.call_count, 1)
+        self.assertFalse(self.redis.exists(c.catalog_lock_key))
+
+    def test_first_catalog_is_waited_for(self):
+        """Without a stored catalog, the first sync loads it"""
+        def refresh():
+            self._store(1, time.time(), {'tb': {'tc_1': {}}})
+            return 1, ""
+
+        with mock.patch.object(catalog, 'refresh', side_effect=refresh):
+            self.assertEqual(catalog.get_tests('tb'), ({'tc_1': {}}, ""))
+        self.assertEqual(catalog._local()['version'], 1)
+
+    def test_old_test_bed_is_not_cached(self):
+        """A test bed read while a new version is swapped in is not cached under the new version"""
+        self._store(1, time.time(), {'tb': {'tc_1': {}}})
+        catalog.sync()
+        hget = self.redis.hget
+
+        def swap(*args):
+            # A new version is swapped in between the read of the test bed and storing it
+            data = hget(*args)
+            self._store(2, time.time(), {'tb': {'tc_2': {}}})
+            catalog._local()['synced'] = 0
+            catalog.sync()
+            return data
+
+        with mock.patch.object(self.redis, 'hget', side_effect=swap):
+            self.assertEqual(catalog.get_tests('tb'), ({'tc_1': {}}, ""))
+        self.assertEqual(catalog.get_tests('tb'), ({'tc_2': {}}, ""))
+
+
+if __name__ == '__main__':
+    unittest.main()
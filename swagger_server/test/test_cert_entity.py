@@ -0,0 +1,174 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import random
+import unittest
+from datetime import datetime, timedelta
+
+from swagger_server import cert_entity as cert
+from swagger_server import constants as c
+
+
+def _reference_base_dictionary(base_info, results, test_cases, cert_tc_list):
+    """_build_base_dictionary() before the single pass over the results, as a reference"""
+    test_bed = base_info.get('testbed_id')
+    test_cases = test_cases.get('tests').get(test_bed)
+    base_dict = {
+        c.axis_1: {},
+        c.axis_2: {},
+        c.axis_3: {},
+        c.axis_4: {},
+    }
+    err_msg = []
+    msg_tc = "For test case '{0}': Could not find the key '{1}' or its value '{2}' is invalid."
+    for test in cert_tc_list:
+        info = test_cases.get(test, {})
+        axis = info.get('axis')
+        if axis not in c.axis_names:
+            err_msg.append(msg_tc.format(test, 'axis', axis))
+        weight = info.get('weight')
+        if not isinstance(weight, int) and 1 <= weight <= 10:
+            err_msg.append(msg_tc.format(test, 'weight', weight))
+        mandatory = info.get('mandatory')
+        if not isinstance(mandatory, bool):
+            err_msg.append(msg_tc.format(test, 'mandatory', mandatory))
+        tc_info = {
+            'name': info.get('name', ''),
+            'weight': weight,
+            'mandatory': mandatory,
+            'results': [],
+            'start_time': '',
+        }
+        tmp_dict = base_dict.get(axis, {})
+        tmp_dict.update({test: tc_info})
+        base_dict.update({axis: tmp_dict})
+
+    all_timestamps = []
+    msg_result = "For test result '{0}': Could not find the key '{1}' or its value '{2}' is invalid."
+    for test in results:
+        if test.get('is_developer_defined'):
+            continue
+        performed = test.get('performed_test', '')
+        tc_result = test.get('success')
+        if not isinstance(tc_result, bool):
+            err_msg.append(msg_result.format(performed, 'success', tc_result))
+        start_time = test.get('start_time')
+        if not start_time:
+            err_msg.append(msg_result.format(performed, 'start_time', start_time))
+        else:
+            all_timestamps.append(start_time)
+        tc_id = test.get('original_test_name')
+        if not tc_id:
+            err_msg.append(msg_result.format(performed, 'original_test_name', tc_id))
+        else:
+            tc = test_cases.get(tc_id)
+            if tc and tc_id in cert_tc_list:
+                axis = tc.get('axis')
+                tmp_dict = base_dict.get(axis, {}).get(tc_id, {})
+                tmp_dict['start_time'] = start_time
+                tmp_result = tmp_dict.get('results', [])
+                tmp_result.append(tc_result)
+            elif not tc:
+                err_msg.append(f"Could not find test '{tc_id}' in test case database (/tests/all).")
+
+    timestamps = [datetime.strptime(x, c.cicd_date_format) for x in all_timestamps]
+    timestamps.sort()
+    onboard_time = timestamps[0] if timestamps else ''
+    if onboard_time:
+        onboard_time = onboard_time - timedelta(minutes=c.onboard_time_offset)
+        onboard_time = onboard_time.strftime(c.cicd_date_format)
+    for tc_id in c.onboarding_tests:
+        tc = test_cases.get(tc_id)
+        axis = tc.get('axis')
+        tmp_dict = base_dict.get(axis, {}).get(tc_id, {})
+        tmp_dict['start_time'] = onboard_time
+        tmp_dict['results'] = [True]
+
+    return base_dict, ' '.join(err_msg)
+
+
+def _timestamp(rng):
+    time = datetime(2023, 1, 1) + timedelta(seconds=rng.randint(0, 400 * 86400))
+    if rng.random() < 0.2:
+        # Not zero-padded, still valid for strptime
+        return f"{time.year}-{time.month}-{time.day} {time.hour}:{time.minute}:{time.second}"
+    return time.strftime(c.cicd_date_format)
+
+
+def _testing(rng):
+    # Catalog of a test bed with the onboarding tests, a list of required tests and results with some invalid fields
+    tests = {x: {'axis': rng.choice(list(c.axis_names)), 'weight': 1, 'mandatory': True, 'name': x}
+             for x in c.onboarding_tests}
+    for i in range(30):
+        tests[f'tc_{i}'] = {
+            'axis': rng.choice(list(c.axis_names) + [7, None]),
+            'weight': rng.randint(1, 10),
+            'mandatory': rng.choice([True, False, 'yes']),
+            'name': f'Test case {i}',
+        }
+    cert_tc_list = rng.sample(sorted(tests), 20)
+    results = []
+    for i in range(60):
+        results.append({
+            'performed_test': f'performed_{i}',
+            'original_test_name': rng.choice(sorted(tests) + ['tc_unknown', '']),
+            'success': rng.choice([True, False, True, None]),
+            'start_time': rng.choice([_timestamp(rng)] * 9 + [None]),
+            'is_developer_defined': rng.random() < 0.1,
+        })
+    return {'testbed_id': 'testbed_itav'}, results, {'tests': {'testbed_itav': tests}}, cert_tc_list
+
+
+class TestBaseDictionary(unittest.TestCase):
+    """The base dictionary is the same as before the single pass over the results"""
+
+    def test_reference(self):
+        """Same base dictionary and error messages for random testings"""
+        rng = random.Random(3)
+        for _ in range(200):
+            testing = _testing(rng)
+            self.assertEqual(cert._build_base_dictionary(*testing), _reference_base_dictionary(*testing))
+
+    def test_streamed_results(self):
+        """The results may be an iterator, they are read once"""
+        base_info, results, test_cases, cert_tc_list = _testing(random.Random(4))
+        self.assertEqual(cert._build_base_dictionary(base_info, iter(results), test_cases, cert_tc_list),
+                         _reference_base_dictionary(base_info, results, test_cases, cert_tc_list))
+
+    def test_invalid_start_time(self):
+        """An invalid start time is reported instead of raising"""
+        base_info, results, test_cases, cert_tc_list = _testing(random.Random(5))
+        results[0].update({'start_time': 'yesterday', 'is_developer_defined': False})
+        _, err_msg = cert._build_base_dictionary(base_info, results, test_cases, cert_tc_list)
+        self.assertIn("For test result 'performed_0': Could not find the key 'start_time' or its value 'yesterday' is "
+                      "invalid.", err_msg)
+
+    def test_missing_onboarding_test(self):
+        """A test bed without the onboarding tests does not fail"""
+        base_info, results, test_cases, cert_tc_list = _testing(random.Random(6))
+        for tc_id in c.onboarding_tests:
+            del test_cases['tests']['testbed_itav'][tc_id]
+        cert_tc_list = [x for x in cert_tc_list if x not in c.onboarding_tests]
+        base_dict, _ = cert._build_base_dictionary(base_info, results, test_cases, cert_tc_list)
+        self.assertFalse(any(x in tests for tests in base_dict.values() for x in c.onboarding_tests))
+
+
+class TestNormaliseResults(unittest.TestCase):
+    """Checks of the test results in one pass"""
+
+    def test_earliest(self):
+        """The earliest start time is found across zero-padded and other timestamps"""
+        results = [
+            {'original_test_name': 'a', 'success': True, 'start_time': '2023-10-02 08:00:00'},
+            {'original_test_name': 'a', 'success': True, 'start_time': '2023-9-30 9:05:00'},
+            {'original_test_name': 'b', 'success': False, 'start_time': '2023-10-01 10:00:00'},
+        ]
+        records, earliest, err_msg = cert._normalise_results(results, {'a': {'axis': 2}, 'b': {'axis': 1}}, {'b'})
+        self.assertEqual(earliest, '2023-09-30 09:05:00')
+        self.assertEqual([(x.tc_id, x.success, x.start_time) for x in records], [('b', False, '2023-10-01 10:00:00')])
+        self.assertEqual(err_msg, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
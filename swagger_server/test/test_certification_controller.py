@@ -5,8 +5,13 @@ from __future__ import absolute_import
 from flask import json
 from six import BytesIO
 
+from swagger_server.models.catalog_info import CatalogInfo  # noqa: E501
+from swagger_server.models.cert_batch_item import CertBatchItem  # noqa: E501
 from swagger_server.models.cert_created import CertCreated  # noqa: E501
+from swagger_server.models.cert_job import CertJob  # noqa: E501
+from swagger_server.models.cert_status import CertStatus  # noqa: E501
 from swagger_server.models.create_cert import CreateCert  # noqa: E501
+from swagger_server.models.readiness import Readiness  # noqa: E501
 from swagger_server.models.server_info import ServerInfo  # noqa: E501
 from swagger_server.models.test_case_list import TestCaseList  # noqa: E501
 from swagger_server.test import BaseTestCase
@@ -26,7 +31,21 @@ class TestCertificationController(BaseTestCase):
             method='POST',
             data=json.dumps(body),
             content_type='application/json')
-        self.assert200(response,
+        self.assertStatus(response, 202,
+                       'Response body is : ' + response.data.decode('utf-8'))
+
+    def test_create_cert_batch(self):
+        """Test case for create_cert_batch
+
+        Create the certificates for several testings at once
+        """
+        body = [CreateCert()]
+        response = self.client.open(
+            '/certificates/batch',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json')
+        self.assertStatus(response, 202,
                        'Response body is : ' + response.data.decode('utf-8'))
 
     def test_get_cert(self):
@@ -43,6 +62,43 @@ class TestCertificationController(BaseTestCase):
         self.assert200(response,
                        'Response body is : ' + response.data.decode('utf-8'))
 
+    def test_get_cert_status(self):
+        """Test case for get_cert_status
+
+        Get the status of the certificate creation for a testing (identified by the test_id)
+        """
+        query_string = [('test_id', 56),
+                        ('access_token', 'access_token_example'),
+                        ('wait', 10)]
+        response = self.client.open(
+            '/certificate/status',
+            method='GET',
+            query_string=query_string)
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+
+    def test_get_metrics(self):
+        """Test case for get_metrics
+
+        Get the metrics of all processes in the Prometheus text format
+        """
+        response = self.client.open(
+            '/metrics',
+            method='GET')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+
+    def test_get_readiness(self):
+        """Test case for get_readiness
+
+        Get the readiness of the server, ready once at least one worker has warmed up its render engine
+        """
+        response = self.client.open(
+            '/ready',
+            method='GET')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+
     def test_get_server_info(self):
         """Test case for get_server_info
 
@@ -68,6 +124,17 @@ class TestCertificationController(BaseTestCase):
         self.assert200(response,
                        'Response body is : ' + response.data.decode('utf-8'))
 
+    def test_refresh_catalog(self):
+        """Test case for refresh_catalog
+
+        Force a refresh of the cached test catalog from the CI/CD Manager
+        """
+        response = self.client.open(
+            '/admin/catalog/refresh',
+            method='POST')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+
 
 if __name__ == '__main__':
     import unittest
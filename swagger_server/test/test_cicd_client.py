@@ -0,0 +1,189 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import io
+import unittest
+from unittest import mock
+
+import requests
+import requests.exceptions
+
+from swagger_server.test import fakeredis, use_fake_redis
+
+if fakeredis is not None:
+    from swagger_server import cicd_client
+    from swagger_server import constants as c
+
+
+def _response(status_code, body=b'{"data": {"a": 1}}'):
+    response = requests.Response()
+    response.status_code = status_code
+    response.raw = io.BytesIO(body)
+    return response
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class TestCicdManagerClient(unittest.TestCase):
+    """Retries, backoff, timeouts and circuit breaker of the CI/CD Manager client, with a stubbed session"""
+
+    def setUp(self):
+        self.redis = use_fake_redis()
+        self.client = cicd_client.CicdManagerClient('https://manager')
+        self.client.breaker = cicd_client.CircuitBreaker(2, 30)
+        self.session_get = self._patch(self.client.session, 'get')
+        self.sleep = self._patch(cicd_client.time, 'sleep')
+
+    def _patch(self, target, attribute, **kwargs):
+        patcher = mock.patch.object(target, attribute, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_retry(self):
+        """Connection errors and timeouts are retried with a jittered exponential backoff"""
+        ok = _response(200)
+        self.session_get.side_effect = [requests.exceptions.ConnectionError('refused'),
+                                        requests.exceptions.ReadTimeout('read'), ok]
+        self.assertIs(self.client.get('/tests/all'), ok)
+        self.assertEqual(self.session_get.call_count, 3)
+        delays = [x.args[0] for x in self.sleep.call_args_list]
+        self.assertEqual(len(delays), 2)
+        for attempt, delay in enumerate(delays):
+            self.assertTrue(0 <= delay <= c.cicd_retry_backoff * 2 ** attempt)
+
+    def test_no_retries(self):
+        """A call with retries=0 tries only once"""
+        self.session_get.side_effect = requests.exceptions.ConnectionError('refused')
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.client.get('/testbeds/all', retries=0)
+        self.assertEqual(self.session_get.call_count, 1)
+        self.sleep.assert_not_called()
+
+    def test_timeouts(self):
+        """Each endpoint has its own timeout, the others the default one"""
+        self.session_get.return_value = _response(200)
+        self.client.get('/testbeds/all', params={'a': 1})
+        self.client.get('/unknown')
+        self.assertEqual(self.session_get.call_args_list[0], mock.call(
+            'https://manager/testbeds/all', params={'a': 1}, headers=None, timeout=c.cicd_timeouts['/testbeds/all'],
+            stream=False))
+        self.assertEqual(self.session_get.call_args_list[1].kwargs['timeout'], c.cicd_timeouts['default'])
+
+    def test_server_error(self):
+        """5xx responses are retried, the last one is returned and counted as a failure"""
+        responses = [_response(500), _response(502), _response(503)]
+        self.session_get.side_effect = responses
+        self.assertIs(self.client.get('/tests/all'), responses[-1])
+        self.assertEqual(self.client.breaker._failures, 1)
+
+    def test_client_error(self):
+        """4xx responses are not retried, the CI/CD Manager answered"""
+        self.session_get.return_value = _response(404)
+        self.assertEqual(self.client.get('/tests/all').status_code, 404)
+        self.assertEqual(self.session_get.call_count, 1)
+        self.assertEqual(self.client.breaker._failures, 0)
+
+    def test_last_try_raises(self):
+        """The error of the last try is raised and counted as a failure"""
+        self.session_get.side_effect = requests.exceptions.ConnectTimeout('connect')
+        with self.assertRaises(requests.exceptions.ConnectTimeout):
+            self.client.get('/tests/all')
+        self.assertEqual(self.session_get.call_count, c.cicd_retries + 1)
+        self.assertEqual(self.client.breaker._failures, 1)
+
+    def test_breaker_opens(self):
+        """After threshold failed calls in a row, the circuit opens for all processes and calls fail fast"""
+        self.session_get.side_effect = requests.exceptions.ConnectionError('refused')
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.client.get('/tests/all')
+        self.assertFalse(self.client.available())
+        self.assertEqual(self.redis.ttl(c.cicd_circuit_key), 30)
+        calls = self.session_get.call_count
+        # Another process sees the open circuit as well
+        other = cicd_client.CicdManagerClient('https://manager')
+        for client in (self.client, other):
+            with self.assertRaises(cicd_client.CicdManagerUnavailable):
+                client.get('/tests/all')
+        self.assertEqual(self.session_get.call_count, calls)
+
+    def test_breaker_closes(self):
+        """After the reset timeout, calls are tried again and a success closes the circuit"""
+        self.session_get.side_effect = requests.exceptions.ConnectionError('refused')
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.client.get('/tests/all')
+        # The reset timeout has passed
+        self.redis.delete(c.cicd_circuit_key)
+        self.assertTrue(self.client.available())
+        self.session_get.side_effect = None
+        self.session_get.return_value = _response(200)
+        self.assertEqual(self.client.get('/tests/all').status_code, 200)
+        # A success resets the count, one more failure does not open the circuit again
+        self.session_get.side_effect = requests.exceptions.ConnectionError('refused')
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.client.get('/tests/all')
+        self.assertTrue(self.client.available())
+
+    def test_failures_in_a_row(self):
+        """Only failures in a row count, a success in between resets the count"""
+        failed_call = [requests.exceptions.ConnectionError('refused')] * (c.cicd_retries + 1)
+        self.session_get.side_effect = failed_call + [_response(200)] + failed_call
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.client.get('/tests/all')
+        self.client.get('/tests/all')
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.client.get('/tests/all')
+        self.assertTrue(self.client.available())
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class TestGetJson(unittest.TestCase):
+    """Failures of get_json are returned as error messages"""
+
+    def setUp(self):
+        use_fake_redis()
+        self.client = cicd_client.CicdManagerClient('https://manager')
+        for patcher in (mock.patch.object(cicd_client, 'get_client', return_value=self.client),
+                        mock.patch.object(cicd_client.time, 'sleep')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _get_json(self, *responses, **kwargs):
+        with mock.patch.object(self.client.session, 'get', side_effect=responses):
+            return cicd_client.get_json('/tests/all', 'Test', **kwargs)
+
+    def test_data(self):
+        """The data of the response, or of the given parse function"""
+        self.assertEqual(self._get_json(_response(200)), ({'a': 1}, ""))
+        self.assertEqual(self._get_json(_response(200), parse=lambda r: r.json()['data']['a']), (1, ""))
+
+    def test_status(self):
+        """A response with another status is an error"""
+        data, err_msg = self._get_json(_response(404, b'not found'))
+        self.assertIsNone(data)
+        self.assertEqual(err_msg, "Could not get data from CI/CD Manager: <404> not found.")
+        self.assertEqual(self._get_json(_response(304), parse=lambda r: None, statuses=(200, 304)), (None, ""))
+
+    def test_connection_error(self):
+        """Connection errors of all tries"""
+        errors = [requests.exceptions.ConnectionError('refused')] * (c.cicd_retries + 1)
+        self.assertEqual(self._get_json(*errors), (None, "Cannot connect to CI/CD Manager."))
+
+    def test_unavailable(self):
+        """An open circuit breaker"""
+        self.client.breaker.is_open = mock.Mock(return_value=True)
+        data, err_msg = self._get_json()
+        self.assertIsNone(data)
+        self.assertIn("CI/CD Manager is unavailable", err_msg)
+
+    def test_invalid_data(self):
+        """A body which is not JSON, or without the expected data"""
+        self.assertEqual(self._get_json(_response(200, b'<html>')),
+                         (None, "Response from /tests/all could not be JSON decoded."))
+        self.assertEqual(self._get_json(_response(200, b'{"data": []}'), parse=lambda r: r.json()['data']['a']),
+                         (None, "Response from /tests/all does not contain the expected data."))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import itertools
+import random
+import unittest
+
+from swagger_server import constants as c
+from swagger_server.conditions import ConditionIndex
+
+
+def _select_by_sets(tests, test_conditions):
+    """Selection of the test cases before the condition index, as a reference"""
+    if len(test_conditions) == 0:
+        return [v.get('id') for k, v in tests.items() if v.get('mandatory') is True]
+    final_list = []
+    conditions_set = set(test_conditions)
+    for _, test_data in tests.items():
+        if test_data.get('mandatory') is True:
+            final_list.append(test_data.get('id'))
+        else:
+            tc_cond = set(test_data.get('test_conditions', []))
+            if tc_cond and tc_cond.issubset(conditions_set):
+                final_list.append(test_data.get('id'))
+    return final_list
+
+
+def _catalog(rng, size):
+    # Test cases with defined and unknown conditions, some mandatory, some without conditions or fields
+    conditions = list(c.test_conditions) + [90, 91]
+    tests = {}
+    for i in range(size):
+        info = {'id': str(i)}
+        if rng.random() < 0.2:
+            info['mandatory'] = rng.choice([True, False, 'true', None])
+        if rng.random() < 0.9:
+            info['test_conditions'] = rng.sample(conditions, rng.randint(0, 3))
+        tests[f'test_{i}'] = info
+    return tests
+
+
+class TestConditionIndex(unittest.TestCase):
+    """The condition index selects the same test cases as the selection by sets"""
+
+    def test_select(self):
+        """Same selection for random catalogs and condition lists, including unknown and repeated conditions"""
+        rng = random.Random(5)
+        conditions = list(c.test_conditions) + [90, 91, 99]
+        for _ in range(20):
+            tests = _catalog(rng, 60)
+            index = ConditionIndex(tests)
+            for _ in range(50):
+                test_conditions = rng.choices(conditions, k=rng.randint(0, 6))
+                self.assertEqual(index.select(test_conditions), _select_by_sets(tests, test_conditions),
+                                 f'conditions {test_conditions}')
+
+    def test_select_all_masks(self):
+        """Same selection for every combination of the defined conditions"""
+        tests = _catalog(random.Random(7), 40)
+        index = ConditionIndex(tests)
+        for n in range(len(c.test_conditions) + 1):
+            for test_conditions in itertools.combinations(c.test_conditions, n):
+                self.assertEqual(index.select(list(test_conditions)), _select_by_sets(tests, test_conditions))
+
+    def test_select_order(self):
+        """The test cases are selected in catalog order"""
+        tests = {
+            'b': {'id': '2', 'test_conditions': [1]},
+            'a': {'id': '1', 'mandatory': True},
+            'c': {'id': '3', 'test_conditions': [1, 2]},
+            'd': {'id': '4', 'test_conditions': []},
+        }
+        index = ConditionIndex(tests)
+        self.assertEqual(index.select([]), ['1'])
+        self.assertEqual(index.select([1]), ['2', '1'])
+        self.assertEqual(index.select([2, 1]), ['2', '1', '3'])
+        self.assertEqual(index.conditions(index.masks['c']), [1, 2])
+
+    def test_empty(self):
+        """A test bed without test cases selects none"""
+        self.assertEqual(ConditionIndex({}).select([1, 2]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import json
+import time
+import unittest
+from unittest import mock
+
+from swagger_server.test import fakeredis, use_fake_redis
+
+if fakeredis is not None:
+    from swagger_server import constants as c
+    from swagger_server import jobs
+    from swagger_server import store
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class TestRecover(unittest.TestCase):
+    """Jobs of dead worker processes are put back on the queue"""
+
+    def setUp(self):
+        self.redis = use_fake_redis()
+
+    def _take(self, worker_id, test_id):
+        # A worker process took the job of a new creation and holds its lease
+        _, fence = store.start(test_id, 'token')
+        job = json.dumps({'test_id': test_id, 'access_token': 'token', 'fence': fence})
+        self.redis.rpush(jobs._processing_key(worker_id), job)
+        store.Lease(test_id, fence)._acquire()
+        return job, fence
+
+    def test_dead_worker(self):
+        """The jobs of a worker without heartbeat are queued again and can take the lease"""
+        job, fence = self._take('dead:1', 1)
+        self.redis.zadd(c.renderers_key, {'dead:1': time.time() - c.renderer_heartbeat_timeout - 1})
+        self.assertEqual(jobs.recover(), 1)
+        self.assertEqual(self.redis.lrange(c.job_queue, 0, -1), [job.encode()])
+        self.assertEqual(self.redis.llen(jobs._processing_key('dead:1')), 0)
+        self.assertEqual(self.redis.llen(jobs._processing_key(jobs._worker_id())), 0)
+        with store.Lease(1, fence) as held:
+            self.assertTrue(held)
+
+    def test_alive_worker(self):
+        """The jobs of a worker with a recent heartbeat are left alone"""
+        self._take('alive:1', 1)
+        self.redis.zadd(c.renderers_key, {'alive:1': time.time()})
+        self.assertEqual(jobs.recover(), 0)
+        self.assertEqual(self.redis.llen(c.job_queue), 0)
+
+    def test_at_start(self):
+        """At start, a worker puts back the jobs left by an earlier process with its host and pid"""
+        job, _ = self._take(jobs._worker_id(), 1)
+        jobs.heartbeat()
+        self.assertEqual(jobs.recover(), 0)
+        self.assertEqual(jobs.recover(at_start=True), 1)
+        self.assertEqual(self.redis.lrange(c.job_queue, 0, -1), [job.encode()])
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class TestBatch(unittest.TestCase):
+    """The creations of a batch job stay alive until their own jobs are taken"""
+
+    def setUp(self):
+        self.redis = use_fake_redis()
+
+    def test_run_batch(self):
+        """The jobs of the batch are queued with their data, their creations stay queued"""
+        bodies = [mock.Mock(test_id=x, access_token='token', to_dict=lambda x=x: {'test_id': x, 'access_token': 'token'})
+                  for x in (1, 2)]
+        self.assertEqual(jobs.enqueue_batch(bodies), [0, 0])
+        batch = json.loads(self.redis.rpop(c.job_queue))['batch']
+        self.assertTrue(store.fail(2, batch[1]['fence'], 'error'))
+        ttls = []
+
+        def fetch(creations):
+            # The creations are not held by a running job while the batch is fetched, they stay queued
+            ttls.append(self.redis.pttl(store._lease_key(1)))
+            return [['data 1'], ['data 2']]
+
+        with mock.patch.object(jobs.cert, 'fetch_batch_test_info', side_effect=fetch):
+            jobs.run_batch(batch)
+        self.assertGreater(ttls[0], c.cert_lease_timeout * 1000)
+        queued = [json.loads(x) for x in self.redis.lrange(c.job_queue, 0, -1)]
+        self.assertEqual([(x['test_id'], x['prefetched']) for x in queued], [(1, ['data 1'])])
+        self.assertTrue(store.lease_alive(1))
+        self.assertGreater(self.redis.pttl(store._lease_key(1)), c.cert_lease_timeout * 1000)
+        with store.Lease(1, queued[0]['fence']) as held:
+            self.assertTrue(held)
+
+
+if __name__ == '__main__':
+    unittest.main()
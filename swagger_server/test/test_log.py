@@ -0,0 +1,68 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import glob
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from swagger_server import constants as c
+from swagger_server import log
+
+# Lines written by each process, over about three rotations
+lines = 150
+line_interval = 0.02
+
+
+def _write(filename, name):
+    # Log lines to a file which is rotated every second, in a process of its own
+    handler = log.LockedTimedRotatingFileHandler(filename, when='S', backupCount=0)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    for i in range(lines):
+        handler.handle(logging.makeLogRecord({'msg': f"{name} {i}"}))
+        time.sleep(line_interval)
+    handler.close()
+
+
+class TestLockedTimedRotatingFileHandler(unittest.TestCase):
+    """Rotation of a log file shared by several processes"""
+
+    def test_two_processes(self):
+        """No line is lost or duplicated when two processes rotate the same file"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'app_server.log')
+            context = multiprocessing.get_context('spawn')
+            processes = [context.Process(target=_write, args=(filename, name)) for name in ('a', 'b')]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join(60)
+                self.assertEqual(process.exitcode, 0)
+            files = glob.glob(f"{filename}*")
+            files.remove(f"{filename}.lock")
+            written = []
+            for file in files:
+                with open(file) as f:
+                    written.extend(f.read().splitlines())
+        self.assertGreater(len(files), 2, 'The file was not rotated')
+        self.assertEqual(sorted(written), sorted(f"{name} {i}" for name in ('a', 'b') for i in range(lines)))
+
+
+class TestPayload(unittest.TestCase):
+    """Payloads of log messages"""
+
+    def test_cut(self):
+        """Long payloads are cut and followed by their length and digest, short ones are kept"""
+        with mock.patch.object(c, 'log_payload_max', 10):
+            self.assertEqual(str(log.Payload({'a': 1})), '{"a": 1}')
+            text = str(log.Payload('x' * 20))
+        self.assertTrue(text.startswith('x' * 10 + '... (20 characters, sha256 '))
+
+
+if __name__ == '__main__':
+    unittest.main()
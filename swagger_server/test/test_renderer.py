@@ -0,0 +1,198 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import contextlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+from unittest import mock
+
+from swagger_server.test import fakeredis, use_fake_redis
+
+from swagger_server import cert_entity
+from swagger_server import chart
+from swagger_server import constants as c
+from swagger_server import render
+from swagger_server import render_client
+from swagger_server import renderer
+
+authkey = b'secret'
+document = (True, 'chart.png', 'app_1.0', b'%PDF-1.7', b'PNG')
+
+
+def _render_document(*args):
+    return document
+
+
+class _Pool:
+    """Stand-in for the render pool, runs the task in the calling thread"""
+
+    def __init__(self, delay=0):
+        self.delay = delay
+
+    def run(self, fn, *args):
+        time.sleep(self.delay)
+        return fn(*args)
+
+
+class _Service:
+    """Renderer service on a temporary socket, serving each connection with renderer._serve()"""
+
+    def __init__(self, pool):
+        self.dir = tempfile.mkdtemp()
+        self.address = os.path.join(self.dir, 'renderer.sock')
+        self.listener = Listener(self.address, family='AF_UNIX', authkey=authkey)
+        self.closed = False
+        threading.Thread(target=self._accept, args=(pool,), daemon=True).start()
+
+    def _accept(self, pool):
+        while not self.closed:
+            try:
+                conn = self.listener.accept()
+            except (AuthenticationError, OSError):
+                continue
+            threading.Thread(target=renderer._serve, args=(conn, pool), daemon=True).start()
+
+    def close(self):
+        self.closed = True
+        self.listener.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+class TestSocketRenderer(unittest.TestCase):
+    """Requests of SocketRenderer to the renderer service over a Unix socket"""
+
+    def setUp(self):
+        patcher = mock.patch.object(cert_entity, 'render_document', _render_document)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _service(self, pool):
+        service = _Service(pool)
+        self.addCleanup(service.close)
+        return service
+
+    def test_render(self):
+        """A document is rendered by the service, the connection is kept for the next render"""
+        service = self._service(_Pool())
+        client = render_client.SocketRenderer(service.address, authkey)
+        self.addCleanup(client.shutdown)
+        client.start()
+        self.assertEqual(client.render({}, {}, {}, {}, 'ITAV'), document)
+        self.assertEqual(client._idle.qsize(), 1)
+        self.assertEqual(client.render({}, {}, {}, {}, 'ITAV'), document)
+        self.assertEqual(client._idle.qsize(), 1)
+
+    def test_render_error(self):
+        """An error of the render is raised as RenderError, the connection can still be used"""
+        service = self._service(_Pool())
+        client = render_client.SocketRenderer(service.address, authkey)
+        self.addCleanup(client.shutdown)
+        with mock.patch.object(cert_entity, 'render_document', side_effect=ValueError('broken template')):
+            with self.assertRaisesRegex(render_client.RenderError, 'broken template'):
+                client.render({}, {}, {}, {}, 'ITAV')
+        self.assertEqual(client.render({}, {}, {}, {}, 'ITAV'), document)
+
+    def test_authkey(self):
+        """A client with another secret is rejected, a client without one is not created"""
+        service = self._service(_Pool())
+        with self.assertRaises(AuthenticationError):
+            render_client.SocketRenderer(service.address, b'other').render({}, {}, {}, {}, 'ITAV')
+        with self.assertRaises(ValueError):
+            render_client.SocketRenderer(service.address, None)
+
+    def test_timeout(self):
+        """A render without answer in time raises RenderTimeout, its connection is not used again"""
+        service = self._service(_Pool(delay=1))
+        client = render_client.SocketRenderer(service.address, authkey)
+        self.addCleanup(client.shutdown)
+        with mock.patch.object(c, 'render_timeout', 0), mock.patch.object(c, 'renderer_reply_margin', 0.2):
+            with self.assertRaises(render_client.RenderTimeout):
+                client.render({}, {}, {}, {}, 'ITAV')
+        self.assertEqual(client._idle.qsize(), 0)
+
+    def test_reconnect(self):
+        """A kept connection which was closed by the service (e.g. after a restart) is replaced by a new one"""
+        service = self._service(_Pool())
+        client = render_client.SocketRenderer(service.address, authkey)
+        self.addCleanup(client.shutdown)
+        closed, other = multiprocessing.Pipe()
+        other.close()
+        client._idle.put(closed)
+        self.assertEqual(client.render({}, {}, {}, {}, 'ITAV'), document)
+        self.assertTrue(closed.closed)
+        self.assertEqual(client._idle.qsize(), 1)
+
+    def test_unknown_request(self):
+        """An unknown request is answered with an error"""
+        service = self._service(_Pool())
+        client = render_client.SocketRenderer(service.address, authkey)
+        self.addCleanup(client.shutdown)
+        with self.assertRaisesRegex(render_client.RenderError, 'Unknown request'):
+            client._request(('stop',))
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class TestInlineRenderer(unittest.TestCase):
+    """A certificate created with RENDERER=inline, which renders in the calling thread"""
+
+    def setUp(self):
+        use_fake_redis()
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        os.mkdir(os.path.join(self.dir, os.path.basename(c.document_dir)))
+
+    def _testing(self):
+        tests = {x: {'id': x, 'axis': c.axis_1, 'weight': 1, 'mandatory': True, 'name': x, 'test_conditions': []}
+                 for x in c.onboarding_tests}
+        results = [{'performed_test': f'p_{x}', 'original_test_name': x, 'success': True,
+                    'start_time': '2023-10-02 08:00:00', 'is_developer_defined': False} for x in tests]
+        base_info = {'test_id': '1', 'access_token': 'token', 'netapp_id': 'app', 'testbed_id': 'testbed_itav',
+                     'app_name': 'App', 'app_version': '1.0', 'app_author': 'Author', 'service_order': '<p>Order</p>',
+                     'test_conditions': []}
+        return base_info, results, {'tests': {'testbed_itav': tests}}
+
+    @contextlib.contextmanager
+    def _inline(self):
+        # WeasyPrint needs Pango, only the PDF step is left out
+        with mock.patch.object(c, 'renderer', 'inline'), mock.patch.object(c, 'cert_files_dir', self.dir), \
+                mock.patch.object(render_client, 'get_renderer', render_client.get_renderer.__wrapped__), \
+                mock.patch.object(render, 'html_to_pdf', return_value=b'%PDF-1.7') as html_to_pdf, \
+                mock.patch.object(cert_entity.testbeds, 'get_name', return_value='ITAV'):
+            self.assertIsInstance(render_client.get_renderer(), render_client.InlineRenderer)
+            yield html_to_pdf
+
+    def test_create_certificate(self):
+        """The chart and the template are rendered, the document is written and found again by its digest"""
+        base_info, results, test_cases = self._testing()
+        with self._inline() as html_to_pdf:
+            is_cert, chart_file, doc_file, name = cert_entity.create_certificate(base_info, results, test_cases)
+            self.assertEqual(cert_entity.create_certificate(base_info, results, test_cases),
+                             (is_cert, chart_file, doc_file, name))
+        self.assertEqual(html_to_pdf.call_count, 1)
+        self.assertIn('App', html_to_pdf.call_args[0][0])
+        with open(os.path.join(self.dir, f'{doc_file}.pdf'), 'rb') as f:
+            self.assertEqual(f.read(), b'%PDF-1.7')
+        self.assertIn('app_1.0', name)
+
+    def test_chart_cache(self):
+        """The chart is cached by the worker and passed to the next render of the same scores"""
+        base_info, results, test_cases = self._testing()
+        with mock.patch.object(chart, 'cache', chart.ChartCache(4)), \
+                mock.patch.object(chart, 'render_radar_chart', wraps=chart.render_radar_chart) as render_chart:
+            with self._inline():
+                cert_entity.create_certificate(base_info, results, test_cases)
+                # Another document with the same scores
+                cert_entity.create_certificate(dict(base_info, app_author='Other'), results, test_cases)
+            self.assertEqual(render_chart.call_count, 1)
+            self.assertEqual(chart.cache.stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+if __name__ == '__main__':
+    unittest.main()
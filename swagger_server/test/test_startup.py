@@ -0,0 +1,40 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+# Modules which only the render processes of the worker may import
+render_modules = ['matplotlib', 'numpy', 'weasyprint', 'concurrent.futures.process']
+# Seconds an API process may take to import the app, far above the usual time to catch only large regressions
+max_import_time = 5.0
+
+
+def _import(module):
+    """Import a module in a new interpreter and return the time it took and the modules it loaded."""
+    code = (f"import json, sys, time\n"
+            f"start = time.perf_counter()\n"
+            f"import {module}\n"
+            f"print(json.dumps([time.perf_counter() - start, sorted(sys.modules)]))\n")
+    output = subprocess.run([sys.executable, '-c', code], cwd=root_dir, check=True, stdout=subprocess.PIPE).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+class TestStartup(unittest.TestCase):
+    """Startup time of the API processes"""
+
+    def test_app_import(self):
+        """The app imports none of the render libraries and stays within the import time budget"""
+        import_time, modules = _import('swagger_server.__main__')
+        loaded = [x for x in render_modules if x in modules]
+        self.assertEqual(loaded, [], 'Render modules imported by the API: ' + ', '.join(loaded))
+        self.assertLess(import_time, max_import_time, f'Importing the app took {import_time:.2f} s')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import time
+import unittest
+from unittest import mock
+
+from swagger_server.test import fakeredis, use_fake_redis
+
+if fakeredis is not None:
+    from swagger_server import constants as c
+    from swagger_server import store
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class TestStore(unittest.TestCase):
+    """State transitions of the certificate creations and their fencing"""
+
+    def setUp(self):
+        self.redis = use_fake_redis()
+
+    def _lease(self, test_id):
+        holder = self.redis.get(store._lease_key(test_id))
+        return holder.decode() if holder is not None else None
+
+    def _finish(self, test_id, fence):
+        return store.finish(test_id, fence, True, 'documents/x.pdf', 'x.pdf', 'x.png')
+
+    def test_start(self):
+        """A started creation is queued with a new fencing token, it cannot be started twice"""
+        status, fence = store.start(1, 'token')
+        self.assertEqual(status, 0)
+        self.assertEqual(store.get(1, 'status', 'fence', 'access_token'), [str(c.status_progress), str(fence), 'token'])
+        self.assertEqual(self._lease(1), str(fence))
+        self.assertEqual(store.start(1, 'token'), (c.status_progress, 0))
+        self.assertEqual(store.start(2, 'token'), (0, fence + 1))
+
+    def test_start_many(self):
+        """Several creations are started at once, except those in progress or finished"""
+        _, fence = store.start(1, 'a')
+        self._finish(1, fence)
+        store.start(2, 'b')
+        started = store.start_many([(1, 'a'), (2, 'b'), (3, 'c')])
+        self.assertEqual([x[0] for x in started], [c.status_finished, c.status_progress, 0])
+        self.assertEqual(self._lease(3), str(started[2][1]))
+
+    def test_queued_creation_is_alive(self):
+        """A queued creation stays alive longer than the lease of a running job, until a worker takes it"""
+        _, fence = store.start(1, 'token')
+        self.assertGreater(self.redis.pttl(store._lease_key(1)), c.cert_lease_timeout * 1000)
+        self.assertTrue(store.lease_alive(1))
+        with store.Lease(1, fence) as held:
+            self.assertTrue(held)
+            self.assertLessEqual(self.redis.pttl(store._lease_key(1)), c.cert_lease_timeout * 1000)
+
+    def test_lease(self):
+        """Only one run of a job holds the lease, the lease is renewed while it is held"""
+        _, fence = store.start(1, 'token')
+        with mock.patch.object(c, 'cert_lease_timeout', 1), mock.patch.object(c, 'cert_lease_renew_interval', 0.2):
+            with store.Lease(1, fence) as held:
+                self.assertTrue(held)
+                with store.Lease(1, fence) as other:
+                    self.assertFalse(other)
+                time.sleep(1.5)
+                self.assertTrue(store.lease_alive(1))
+        self.assertTrue(self._finish(1, fence))
+        self.assertFalse(store.lease_alive(1))
+
+    def test_lease_after_restart(self):
+        """The job of a creation which was started again does not get the lease"""
+        _, old_fence = store.start(1, 'token')
+        self.redis.delete(store._lease_key(1))
+        _, fence = store.start(1, 'token')
+        with store.Lease(1, old_fence) as held:
+            self.assertFalse(held)
+        with store.Lease(1, fence) as held:
+            self.assertTrue(held)
+
+    def test_lease_after_end(self):
+        """A job of a creation which has ended does not get the lease"""
+        _, fence = store.start(1, 'token')
+        store.fail(1, fence, 'error')
+        with store.Lease(1, fence) as held:
+            self.assertFalse(held)
+
+    def test_finish_stale_fence(self):
+        """The outcome of a creation which was started again is discarded"""
+        _, old_fence = store.start(1, 'token')
+        self.redis.delete(store._lease_key(1))
+        _, fence = store.start(1, 'token')
+        self.assertFalse(self._finish(1, old_fence))
+        self.assertFalse(store.fail(1, old_fence, 'error'))
+        self.assertEqual(store.get(1, 'status', 'cert'), [str(c.status_progress), None])
+        self.assertTrue(store.lease_alive(1))
+        self.assertTrue(self._finish(1, fence))
+        self.assertEqual(store.get(1, 'status', 'cert'), [str(c.status_finished), 'documents/x.pdf'])
+
+    def test_finish_releases_queued_lease(self):
+        """Ending a creation whose job was not taken yet releases its lease"""
+        _, fence = store.start(1, 'token')
+        self.assertTrue(store.fail(1, fence, 'error'))
+        self.assertFalse(store.lease_alive(1))
+
+    def test_requeue(self):
+        """A creation whose worker died is queued again and its job can take the lease"""
+        _, fence = store.start(1, 'token')
+        dead = store.Lease(1, fence)
+        self.assertTrue(dead._acquire())
+        with store.Lease(1, fence) as held:
+            self.assertFalse(held)
+        self.assertEqual(store.requeue([(1, fence), (2, 1)]), [True, False])
+        self.assertEqual(self._lease(1), str(fence))
+        with store.Lease(1, fence) as held:
+            self.assertTrue(held)
+
+
+if __name__ == '__main__':
+    unittest.main()
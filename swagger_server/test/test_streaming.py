@@ -0,0 +1,126 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import hashlib
+import io
+import json
+import unittest
+from unittest import mock
+
+import requests
+import requests.exceptions
+
+from swagger_server import constants as c
+from swagger_server import streaming
+
+catalog = {
+    'data': {
+        'tests': {
+            'testbed_itav': {
+                'tc_1': {'id': '1', 'axis': 1, 'weight': 0.5, 'mandatory': True, 'test_conditions': []},
+                'tc_2': {'id': '2', 'name': 'Ünïcode', 'test_conditions': [1, 2], 'extra': {'nested': [1, None]}},
+            },
+            'testbed_other': {},
+        },
+        'version': 3,
+    },
+    'message': 'ok',
+}
+performed = {
+    'data': [
+        {'performed_test': 'p1', 'original_test_name': 'tc_1', 'success': True, 'start_time': '2023-10-02 08:00:00',
+         'is_developer_defined': False, 'log': 'x' * 100, 'metrics': {'cpu': 1.5}},
+        {'performed_test': 'p2', 'success': None},
+        'not a test',
+    ],
+}
+
+
+def _response(data):
+    body = json.dumps(data).encode() if not isinstance(data, bytes) else data
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    return response
+
+
+def _both(test):
+    """Run a test with ijson (in small chunks) and without"""
+    def run(self):
+        with self.subTest(streaming=False), mock.patch.object(c, 'cicd_stream_json', False):
+            test(self)
+        if streaming.ijson is None:
+            return
+        with self.subTest(streaming=True), mock.patch.object(c, 'cicd_stream_json', True), \
+                mock.patch.object(streaming, '_chunk_size', 7):
+            test(self)
+    run.__doc__ = test.__doc__
+    return run
+
+
+class TestPerformedTests(unittest.TestCase):
+    """Performed tests with only the fields of constants.result_fields, with and without ijson"""
+
+    @_both
+    def test_fields(self):
+        """Only the needed fields of the tests are kept, other items are passed on"""
+        self.assertEqual(streaming.performed_tests(_response(performed), '/gui/tests-performed'), [
+            {'performed_test': 'p1', 'original_test_name': 'tc_1', 'success': True,
+             'start_time': '2023-10-02 08:00:00', 'is_developer_defined': False},
+            {'performed_test': 'p2', 'success': None},
+            'not a test',
+        ])
+
+    @_both
+    def test_empty(self):
+        """No performed tests"""
+        self.assertEqual(streaming.performed_tests(_response({'data': []}), '/gui/tests-performed'), [])
+
+    @_both
+    def test_invalid(self):
+        """A body which is not valid JSON raises JSONDecodeError"""
+        with self.assertRaises(requests.exceptions.JSONDecodeError):
+            streaming.performed_tests(_response(b'{"data": [{"success": tr'), '/gui/tests-performed')
+
+
+class TestCatalogTestBeds(unittest.TestCase):
+    """Test beds of the catalog one at a time and the digest of the body, with and without ijson"""
+
+    @_both
+    def test_test_beds(self):
+        """The test beds are the same as decoded with json, and the digest is the one of the whole body"""
+        body = json.dumps(catalog).encode()
+        test_beds = streaming.CatalogTestBeds(_response(body), '/tests/all')
+        self.assertIsNone(test_beds.digest)
+        self.assertEqual(dict(test_beds), catalog['data']['tests'])
+        self.assertEqual(test_beds.digest, hashlib.sha256(body).hexdigest())
+
+    @_both
+    def test_no_tests(self):
+        """A catalog without tests has no test beds"""
+        test_beds = streaming.CatalogTestBeds(_response({'data': {}}), '/tests/all')
+        self.assertEqual(list(test_beds), [])
+        self.assertIsNotNone(test_beds.digest)
+
+    @_both
+    def test_invalid(self):
+        """A body which is not valid JSON raises JSONDecodeError"""
+        with self.assertRaises(requests.exceptions.JSONDecodeError):
+            list(streaming.CatalogTestBeds(_response(b'{"data": {"tests": {"a": [}}'), '/tests/all'))
+
+    @unittest.skipIf(streaming.ijson is None, 'ijson is not installed')
+    def test_digest_parity(self):
+        """The digest of a catalog is the same with and without ijson, so switching does not change its version"""
+        body = json.dumps(catalog, indent=2).encode()
+        digests = []
+        for enabled in (False, True):
+            with mock.patch.object(c, 'cicd_stream_json', enabled):
+                test_beds = streaming.CatalogTestBeds(_response(body), '/tests/all')
+                list(test_beds)
+                digests.append(test_beds.digest)
+        self.assertEqual(digests[0], digests[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
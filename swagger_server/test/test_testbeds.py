@@ -0,0 +1,53 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import time
+import unittest
+from unittest import mock
+
+from swagger_server.test import fakeredis, use_fake_redis
+
+if fakeredis is not None:
+    from swagger_server import constants as c
+    from swagger_server import testbeds
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class TestTestBeds(unittest.TestCase):
+    """Loading and refreshing the test bed names of a process"""
+
+    def setUp(self):
+        self.redis = use_fake_redis()
+        self.local = {'names': {}, 'fetched_at': None}
+
+    def _get_json(self, names, err_msg=""):
+        return mock.patch.object(testbeds.cicd_client, 'get_json', return_value=(names, err_msg))
+
+    def test_first_load(self):
+        """The first load tries the CI/CD Manager only once"""
+        with self._get_json(None, "Cannot connect to CI/CD Manager.") as get_json:
+            testbeds._update(self.local, retries=0)
+        self.assertEqual(get_json.call_args.kwargs['retries'], 0)
+        self.assertEqual(self.local['names'], {})
+
+    def test_refresh(self):
+        """The names are refreshed once they are older than the refresh interval, and only read again when changed"""
+        with self._get_json({'1': 'ITAV'}) as get_json:
+            testbeds._update(self.local)
+            self.assertEqual(self.local['names'], {'1': 'ITAV'})
+            self.redis.delete(c.testbed_lock_key)
+            with mock.patch.object(self.redis, 'hgetall', wraps=self.redis.hgetall) as hgetall:
+                testbeds._update(self.local)
+            self.assertEqual(get_json.call_count, 1)
+            hgetall.assert_not_called()
+            # Older than the refresh interval
+            self.redis.set(c.testbed_meta_key, time.time() - c.testbed_refresh_interval - 1)
+            get_json.return_value = ({'1': 'ITAV', '2': 'OdinS'}, "")
+            testbeds._update(self.local)
+        self.assertEqual(get_json.call_count, 2)
+        self.assertEqual(self.local['names'], {'1': 'ITAV', '2': 'OdinS'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Test bed registry
+
+Maps test bed IDs to their names for the certificate. The map from the CI/CD Manager (/testbeds/all) is stored in
+Redis and shared by all processes. Each process loads it once and refreshes it in a background thread, so rendering a
+certificate never waits for the CI/CD Manager beyond a single try of the first load. If the map cannot be refreshed,
+the last known map is kept.
+"""
+import os
+import threading
+import time
+
+from swagger_server import cicd_client
+from swagger_server import constants as c
+from swagger_server import log
+from swagger_server import util
+from swagger_server.controllers.__init__ import logger, mRedis
+
+
+def _names(response):
+    return {str(x['id']): x['name'] for x in response.json()['data']['testbeds']}
+
+
+def refresh(retries=None):
+    """Fetch the test beds from the CI/CD Manager and store the map in Redis.
+
+    :param retries: retries after the first try, constants.cicd_retries if not given
+    :type retries: int
+
+    :return: error message if the test beds could not be fetched
+    :rtype: str
+    """
+    uri = '/testbeds/all'
+    names, err_msg = cicd_client.get_json(uri, f"Test beds with '{uri}'", parse=_names, retries=retries)
+    if err_msg:
+        return err_msg
+
+    pipe = mRedis.pipeline()
+    pipe.delete(c.testbed_key)
+    if names:
+        pipe.hset(c.testbed_key, mapping=names)
+    pipe.set(c.testbed_meta_key, time.time())
+    pipe.execute()
+    logger.debug("Test bed names updated: %s", log.Payload(names))
+    return ""
+
+
+def _update(local, retries=None):
+    fetched_at = float(mRedis.get(c.testbed_meta_key) or 0)
+    if time.time() - fetched_at > c.testbed_refresh_interval:
+        # Only one process asks the CI/CD Manager, the others read the result from Redis
+        if mRedis.set(c.testbed_lock_key, os.getpid(), nx=True, ex=c.testbed_lock_timeout):
+            refresh(retries)
+            fetched_at = float(mRedis.get(c.testbed_meta_key) or 0)
+    if fetched_at == local['fetched_at']:
+        return
+    names = {k.decode(): v.decode() for k, v in mRedis.hgetall(c.testbed_key).items()}
+    if names:
+        local['names'] = names
+        local['fetched_at'] = fetched_at
+
+
+def _refresh_loop(local):
+    # The age is checked more often than it expires, so the map is refreshed about every testbed_refresh_interval
+    while True:
+        time.sleep(c.testbed_check_interval)
+        try:
+            _update(local)
+        except Exception as e:
+            logger.error("Could not refresh test bed names, keeping the last known ones: %s", e)
+
+
+@util.per_process
+def _local():
+    # Process-local copy of the map, loaded once and refreshed by a background thread. The first load is on the path of a
+    # job, it tries the CI/CD Manager only once, the background thread tries again later.
+    local = {'names': {}, 'fetched_at': None}
+    try:
+        _update(local, retries=0)
+    except Exception as e:
+        logger.error("Could not load test bed names: %s", e)
+    threading.Thread(target=_refresh_loop, args=(local,), name='testbed-registry', daemon=True).start()
+    return local
+
+
+def get_name(id_):
+    """Return the name of a test bed, or the ID itself if the name is not known.
+
+    :param id_: test bed ID
+    :type id_: str
+
+    :rtype: str
+    """
+    return _local()['names'].get(str(id_), id_)
@@ -0,0 +1,236 @@
+"""
+Tracing of the certificate requests
+
+Every create_cert, create_cert_batch and get_cert request is one trace. Its spans cover the calls to the CI/CD Manager,
+the Redis commands and the stages of the certificate creation (see metrics.stage()). The current span is kept in a
+context variable. Other threads get the trace with bind(), queued jobs and render processes with the trace context of
+inject() (a W3C traceparent), which they continue with attach().
+
+Spans are only recorded within a trace, and traces are only started if an exporter is set. Ended spans are handed to
+the exporter of the process, which is chosen by constants.trace_exporter or set with set_exporter(). JsonLinesExporter
+appends them to a file as JSON lines, for offline analysis, e.g. the slowest stage of the slowest certificates.
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+
+import redis
+import redis.client
+
+from swagger_server import constants as c
+
+
+class Span:
+    """Timed operation of a trace.
+
+    :param trace_id: ID of the trace (32 hex digits)
+    :type trace_id: str
+    :param parent_id: ID of the parent span (16 hex digits), None for the root span
+    :type parent_id: str
+    :param name: name of the operation
+    :type name: str
+    :param attributes: details of the operation, e.g. test_id
+    :type attributes: dict
+    """
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'attributes', 'start', 'duration', 'error')
+
+    def __init__(self, trace_id, parent_id, name, attributes):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration': self.duration,
+            'error': self.error,
+            'attributes': self.attributes,
+            'pid': os.getpid(),
+        }
+
+
+class _RemoteParent:
+    # Span of another thread or process, continued with attach()
+    __slots__ = ('trace_id', 'span_id')
+
+    def __init__(self, trace_id, span_id):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+
+class JsonLinesExporter:
+    """Append ended spans to a file, one JSON object per line. Each span is written with a single append, so the
+    processes can share the file.
+
+    :param path: path of the file
+    :type path: str
+    """
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = (json.dumps(span.to_dict(), default=str) + '\n').encode()
+        with self._lock:
+            if self._pid != os.getpid():
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                self._pid = os.getpid()
+            os.write(self._fd, line)
+
+
+_current = contextvars.ContextVar('span', default=None)
+_exporter = {
+    'exporter': JsonLinesExporter(c.trace_file) if c.trace_exporter == 'jsonl' else None,
+}
+
+
+def set_exporter(exporter):
+    """Set the exporter of this process. Tracing is off without an exporter.
+
+    :param exporter: object with a method export(span), None to turn tracing off
+    """
+    _exporter['exporter'] = exporter
+
+
+@contextlib.contextmanager
+def _run(span):
+    token = _current.set(span)
+    start = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        span.error = repr(e)
+        raise
+    finally:
+        span.duration = time.perf_counter() - start
+        _current.reset(token)
+        try:
+            _exporter['exporter'].export(span)
+        except Exception:
+            # Tracing must never fail a request
+            pass
+
+
+@contextlib.contextmanager
+def trace(name, **attributes):
+    """Start a new trace with a root span, if tracing is on.
+
+    :param name: name of the operation
+    :type name: str
+    :param attributes: details of the operation
+
+    :return: the root span, None if tracing is off
+    :rtype: Span
+    """
+    if _exporter['exporter'] is None:
+        yield None
+        return
+    with _run(Span(os.urandom(16).hex(), None, name, attributes)) as span:
+        yield span
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """Record an operation as a span of the current trace. Outside of a trace, nothing is recorded.
+
+    :param name: name of the operation
+    :type name: str
+    :param attributes: details of the operation, more can be set on the span
+
+    :return: the span, None outside of a trace
+    :rtype: Span
+    """
+    parent = _current.get()
+    if parent is None or _exporter['exporter'] is None:
+        yield None
+        return
+    with _run(Span(parent.trace_id, parent.span_id, name, attributes)) as child:
+        yield child
+
+
+def inject():
+    """Return the context of the current span, to continue the trace in a job or another process with attach().
+
+    :return: W3C traceparent, None outside of a trace
+    :rtype: str
+    """
+    current = _current.get()
+    if current is None:
+        return None
+    return f"00-{current.trace_id}-{current.span_id}-01"
+
+
+@contextlib.contextmanager
+def attach(traceparent):
+    """Continue the trace of inject() in the current context.
+
+    :param traceparent: trace context from inject(), nothing is continued if None or invalid
+    :type traceparent: str
+    """
+    parts = traceparent.split('-') if isinstance(traceparent, str) else []
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        yield
+        return
+    token = _current.set(_RemoteParent(parts[1], parts[2]))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def run_attached(traceparent, fn, *args):
+    """Run a function in the trace of inject(), e.g. in a render process.
+
+    :param traceparent: trace context from inject()
+    :type traceparent: str
+    :param fn: module-level function
+    :type fn: callable
+    :param args: arguments of the function
+
+    :return: result of the function
+    """
+    with attach(traceparent):
+        return fn(*args)
+
+
+def bind(fn):
+    """Return the function bound to a copy of the current context, to run it in the trace from another thread.
+
+    :type fn: callable
+    :rtype: callable
+    """
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+class TracedPipeline(redis.client.Pipeline):
+    """Redis pipeline which records its execution as one span."""
+
+    def execute(self, raise_on_error=True):
+        with span('redis pipeline', commands=len(self.command_stack)):
+            return super().execute(raise_on_error)
+
+
+class TracedRedis(redis.Redis):
+    """Redis client which records a span for each command."""
+
+    def execute_command(self, *args, **options):
+        with span(f"redis {args[0]}"):
+            return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return TracedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
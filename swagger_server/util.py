@@ -1,4 +1,7 @@
 import datetime
+import functools
+import os
+import threading
 
 import six
 import typing
@@ -140,3 +143,32 @@ def _deserialize_dict(data, boxed_type):
     """
     return {k: _deserialize(v, boxed_type)
             for k, v in six.iteritems(data)}
+
+
+def per_process(factory):
+    """Decorator for a function which creates an object of the process, e.g. a client with its own connections. The
+    object is created by the first call and returned by the later ones. A forked process creates its own object instead
+    of using the one of its parent, which may hold connections or locks of threads that do not exist in the child.
+
+    :param factory: function without arguments which creates the object
+    :type factory: callable
+
+    :return: function which returns the object of the current process
+    :rtype: callable
+    """
+    state = {
+        'pid': None,
+        'value': None,
+        'lock': threading.Lock(),
+    }
+    # The lock may be held by another thread of the parent at the time of a fork
+    os.register_at_fork(after_in_child=lambda: state.update(lock=threading.Lock()))
+
+    @functools.wraps(factory)
+    def get():
+        with state['lock']:
+            if state['pid'] != os.getpid():
+                state['value'] = factory()
+                state['pid'] = os.getpid()
+            return state['value']
+    return get
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Start the worker that creates the queued certificates: a number of threads take the jobs from the queue and fetch the
+data, the rendering is done by the render pool of the worker or by the renderer service (see render_client.py).
+"""
+import signal
+import threading
+import time
+
+from swagger_server import __init__
+from swagger_server import cert_entity as cert
+from swagger_server import constants as c
+from swagger_server import jobs
+from swagger_server import render_client
+from swagger_server import store
+from swagger_server.controllers.__init__ import logger, mRedis
+
+
+def _start_thread():
+    thread = threading.Thread(target=jobs.work, name='job', daemon=True)
+    thread.start()
+    return thread
+
+
+def _recover():
+    # One worker looks for the jobs of dead worker processes per interval
+    if mRedis.set(c.job_recover_key, time.time(), nx=True, ex=c.job_recover_interval):
+        jobs.recover()
+
+
+def _sweep():
+    # One worker evicts the unused documents per interval, the key expires with the interval
+    if mRedis.set(c.document_sweep_key, time.time(), nx=True, ex=c.document_sweep_interval):
+        cert.evict_documents()
+
+
+def main():
+    store.migrate()
+    renderer = render_client.get_renderer()
+    renderer.start()
+
+    def stop(signum, frame):
+        renderer.shutdown()
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    jobs.recover(at_start=True)
+    jobs.heartbeat()
+    threads = [_start_thread() for _ in range(c.worker_threads)]
+    logger.info("Started %d certificate worker threads", len(threads))
+    # Replace threads that died, e.g. after losing the connection to Redis
+    while True:
+        for i, thread in enumerate(threads):
+            if not thread.is_alive():
+                logger.error("Worker thread died, restarting")
+                threads[i] = _start_thread()
+        try:
+            jobs.heartbeat()
+            _recover()
+        except Exception as e:
+            logger.error("Could not send the heartbeat or recover the jobs of dead workers: %s", e)
+        try:
+            _sweep()
+        except Exception as e:
+            logger.error("Could not evict unused documents: %s", e)
+        time.sleep(c.job_poll_timeout)
+
+
+if __name__ == '__main__':
+    main()